@@ -0,0 +1,173 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from itertools import combinations
+
+import numpy as np
+from sqlalchemy import func
+
+from models import db, Response
+
+BATCH_SIZE = 5000
+CACHE_SIZE = 64
+PERCENTILES = (10, 25, 50, 75, 90)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def analytics_key(survey):
+    """Clé de cache : change dès qu'une réponse ou une question est modifiée.
+
+    Identique d'un processus à l'autre, pour retrouver le résultat d'une
+    tâche de fond exécutée par un autre worker.
+    """
+    count, last = (db.session.query(func.count(Response.id), func.max(Response.submitted_at))
+                   .filter(Response.survey_id == survey.id)
+                   .one())
+    questions = json.dumps(survey.get_questions(), sort_keys=True)
+    return survey.id, count, last, hashlib.sha1(questions.encode('utf-8')).hexdigest()
+
+
+def key_digest(key):
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+
+
+def load_columns(survey, batch_size=BATCH_SIZE):
+    """Charge les réponses par lots dans des tableaux NumPy, une colonne par question.
+
+    Les colonnes `choice` et `text` sont de type objet (None si absent),
+    les colonnes `rating` sont des flottants (NaN si absent).
+    """
+    questions = survey.get_questions()
+    raw_columns = {str(q['id']): [] for q in questions}
+    submitted = []
+
+    rows = (db.session.query(Response.answers, Response.submitted_at)
+            .filter(Response.survey_id == survey.id)
+            .yield_per(batch_size))
+    for raw, submitted_at in rows:
+        answers = json.loads(raw or '{}')
+        for q_id, column in raw_columns.items():
+            column.append(answers.get(q_id))
+        submitted.append(submitted_at)
+
+    columns = {}
+    for question in questions:
+        q_id = str(question['id'])
+        if question['type'] == 'rating':
+            columns[q_id] = np.array(
+                [v if isinstance(v, (int, float)) else np.nan for v in raw_columns[q_id]],
+                dtype=np.float64)
+        else:
+            columns[q_id] = np.array(raw_columns[q_id], dtype=object)
+    return columns, np.array(submitted, dtype='datetime64[s]')
+
+
+def _encode(column, labels):
+    """Encode une colonne de choix en entiers (-1 pour une valeur inconnue)."""
+    index = {label: i for i, label in enumerate(labels)}
+    return np.fromiter((index.get(v, -1) for v in column), dtype=np.int64, count=len(column))
+
+
+def choice_histogram(codes, labels):
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    return dict(zip(labels, counts.tolist()))
+
+
+def rating_stats(values):
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return {'count': 0}
+    levels, counts = np.unique(values, return_counts=True)
+    return {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'median': float(np.median(values)),
+        'stddev': float(values.std()),
+        'percentiles': dict(zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist())),
+        'histogram': {int(level): int(n) for level, n in zip(levels, counts)},
+    }
+
+
+def cross_tab(codes_a, labels_a, codes_b, labels_b):
+    """Tableau croisé de deux questions à choix : matrice len(a) x len(b)."""
+    mask = (codes_a >= 0) & (codes_b >= 0)
+    flat = codes_a[mask] * len(labels_b) + codes_b[mask]
+    matrix = np.bincount(flat, minlength=len(labels_a) * len(labels_b))
+    return {'rows': labels_a, 'columns': labels_b,
+            'counts': matrix.reshape(len(labels_a), len(labels_b)).tolist()}
+
+
+def timeline(submitted, unit='D'):
+    """Nombre de réponses par intervalle de temps (jour par défaut)."""
+    if not submitted.size:
+        return []
+    buckets, counts = np.unique(submitted.astype(f'datetime64[{unit}]'), return_counts=True)
+    return [(str(bucket), int(n)) for bucket, n in zip(buckets, counts)]
+
+
+def compute_analytics(survey):
+    columns, submitted = load_columns(survey)
+    questions = survey.get_questions()
+    analytics = {'response_count': int(submitted.size), 'questions': {},
+                 'cross_tabs': [], 'timeline': timeline(submitted)}
+
+    encoded = {}
+    for question in questions:
+        q_id = str(question['id'])
+        column = columns[q_id]
+        if question['type'] == 'choice':
+            labels = list(question.get('choices', []))
+            encoded[q_id] = (_encode(column, labels), labels)
+            stats = {'histogram': choice_histogram(*encoded[q_id])}
+        elif question['type'] == 'rating':
+            stats = rating_stats(column)
+        else:  # text
+            answered = column[column != None]  # noqa: E711 - comparaison élément par élément
+            lengths = np.fromiter((len(str(v)) for v in answered), dtype=np.int64, count=answered.size)
+            stats = {'count': int(answered.size),
+                     'mean_length': float(lengths.mean()) if lengths.size else 0.0}
+        analytics['questions'][q_id] = dict(stats, type=question['type'], text=question.get('text'))
+
+    for (id_a, (codes_a, labels_a)), (id_b, (codes_b, labels_b)) in combinations(encoded.items(), 2):
+        analytics['cross_tabs'].append(
+            dict(cross_tab(codes_a, labels_a, codes_b, labels_b), questions=(id_a, id_b)))
+    return analytics
+
+
+def cached_analytics(survey):
+    """Retourne (clé de cache, statistiques en cache ou None).
+
+    Le nombre de réponses est `key[1]`.
+    """
+    key = analytics_key(survey)
+    with _cache_lock:
+        analytics = _cache.get(key)
+        if analytics is not None:
+            _cache.move_to_end(key)
+    return key, analytics
+
+
+def process_analytics(survey, key=None):
+    """Retourne les statistiques du sondage, depuis le cache si rien n'a changé."""
+    key = key or analytics_key(survey)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    analytics = compute_analytics(survey)
+    store_analytics(key, analytics)
+    return analytics
+
+
+def store_analytics(key, analytics):
+    with _cache_lock:
+        # Une seule entrée par sondage : les anciennes versions sont obsolètes
+        for stale in [k for k in _cache if k[0] == key[0]]:
+            del _cache[stale]
+        _cache[key] = analytics
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
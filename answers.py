@@ -0,0 +1,53 @@
+from sqlalchemy import func
+
+from models import db
+
+
+class ResponseAnswer(db.Model):
+    """Une ligne par réponse à une question : version normalisée de `Response.answers`.
+
+    `choice` contient la valeur textuelle (option choisie, note ou texte libre),
+    `value` la valeur numérique pour les questions de type note.
+    """
+    __tablename__ = 'response_answer'
+    __table_args__ = (
+        db.Index('ix_response_answer_choice', 'survey_id', 'question_id', 'choice'),
+        db.Index('ix_response_answer_value', 'survey_id', 'question_id', 'value'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    survey_id = db.Column(db.Integer, db.ForeignKey('survey.id'), nullable=False)
+    response_id = db.Column(db.Integer, db.ForeignKey('response.id', ondelete='CASCADE'),
+                            nullable=False, index=True)
+    question_id = db.Column(db.String(64), nullable=False)
+    choice = db.Column(db.Text)
+    value = db.Column(db.Float)
+
+    response = db.relationship('Response', backref=db.backref(
+        'answer_rows', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True))
+
+
+def answer_rows(survey_id, answers):
+    """Construit les lignes normalisées d'un dict de réponses {question: réponse}."""
+    rows = []
+    for question_id, answer in answers.items():
+        for option in (answer if isinstance(answer, list) else [answer]):
+            rows.append({
+                'survey_id': survey_id,
+                'question_id': str(question_id),
+                'choice': None if option is None else str(option),
+                'value': float(option) if isinstance(option, (int, float)) else None,
+            })
+    return rows
+
+
+def rating_averages(survey_id):
+    """Moyenne et nombre de notes par question : {question: {'average': x, 'count': n}}."""
+    rows = (db.session.query(ResponseAnswer.question_id,
+                             func.avg(ResponseAnswer.value),
+                             func.count(ResponseAnswer.value))
+            .filter(ResponseAnswer.survey_id == survey_id,
+                    ResponseAnswer.value.isnot(None))
+            .group_by(ResponseAnswer.question_id))
+    return {question_id: {'average': float(average), 'count': count}
+            for question_id, average, count in rows}
@@ -1,15 +1,44 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify
+from flask import (Flask, render_template, redirect, url_for, flash, request, jsonify,
+                   abort, send_file, stream_with_context)
 from config import Config
 from models import db, User, Survey, Response
 from forms import (RegistrationForm, LoginForm, SurveyForm, ResponseForm, 
                   ProfileForm, SearchForm)
+from flask_migrate import Migrate, stamp
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from assets import Assets, build
+from analytics import cached_analytics, process_analytics
+from answers import rating_averages
+from archive import (ArchivedSurvey, RETENTION_DAYS, archive_expired, archive_rows,
+                     latest_archive)
+from httpcache import (conditional_response, fragment_cache, make_etag, not_modified,
+                       survey_etag)
+from ingest import (CREATED, DUPLICATE, QUEUED, bulk_save_responses, configure_sqlite,
+                    save_response)
+from export import FORMATS, generate_export
+from jobs import (Job, DONE, PENDING, RUNNING, find_active_job, latest_job, load_analytics_result,
+                  requeue_if_stale, submit_job)
+from live import broker, stream_results
+from metrics import Metrics
+from pagination import keyset_page, page_size
+from search import index_survey, rebuild_index, search
+from survey_cache import bump_version, get_definition, survey_cache
+from tallies import rebuild_results, get_results
+from textstats import text_summaries
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+import click
 import json
 
 app = Flask(__name__)
 app.config.from_object(Config)
 db.init_app(app)
+migrate = Migrate(app, db)
+with app.app_context():
+    configure_sqlite(db.engine)
+metrics = Metrics(app)
+static_assets = Assets(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
@@ -33,9 +62,15 @@ def admin():
     if not is_admin():
         flash('Accès non autorisé. Vous devez être administrateur.', 'danger')
         return redirect(url_for('index'))
-    surveys = Survey.query.all()
-    users = User.query.all()
-    return render_template('admin.html', surveys=surveys, users=users)
+    limit = page_size(request.args.get('per_page', type=int))
+    surveys = keyset_page(Survey.query, Survey.id, request.args.get('surveys'), limit,
+                          created_column=Survey.created_at)
+    users = keyset_page(User.query, User.id, request.args.get('users'), limit)
+    return render_template('admin.html',
+                         surveys=surveys.items,
+                         users=users.items,
+                         next_surveys=surveys.next_cursor,
+                         next_users=users.next_cursor)
 
 # Routes d'authentification
 @app.route('/register', methods=['GET', 'POST'])
@@ -124,6 +159,8 @@ def create_survey():
             )
 
             db.session.add(survey)
+            db.session.flush()
+            index_survey(survey)
             db.session.commit()
 
             flash('Sondage créé avec succès!', 'success')
@@ -173,7 +210,16 @@ def edit_survey(survey_id):
             survey.questions = json.dumps(questions)
             survey.end_date = form.end_date.data
 
+            index_survey(survey)
             db.session.commit()
+            bump_version(survey.id)
+            fragment_cache.invalidate(survey.id)
+            # Les identifiants de questions ont pu changer : les compteurs sont
+            # recalculés en tâche de fond. Une tâche déjà en cours a pu lire
+            # l'ancienne structure ; une tâche en attente lira la nouvelle.
+            pending = find_active_job('rebuild_results', survey.id)
+            if pending is None or pending.status == RUNNING:
+                submit_job('rebuild_results', survey_id=survey.id, created_by=current_user.id)
             flash('Sondage mis à jour avec succès!', 'success')
             return redirect(url_for('index'))
         except Exception as e:
@@ -194,11 +240,15 @@ def delete_survey(survey_id):
         return redirect(url_for('index'))
     
     try:
-        # Supprimer d'abord les réponses associées
-        Response.query.filter_by(survey_id=survey_id).delete()
-        db.session.delete(survey)
+        # Le sondage est fermé tout de suite ; les réponses sont supprimées
+        # par lots en tâche de fond
+        survey.is_active = False
         db.session.commit()
-        flash('Sondage supprimé avec succès.', 'success')
+        bump_version(survey_id)
+        fragment_cache.invalidate(survey_id)
+        if not find_active_job('delete_survey', survey_id):
+            submit_job('delete_survey', survey_id=survey_id, created_by=current_user.id)
+        flash('Suppression du sondage en cours.', 'success')
     except Exception as e:
         db.session.rollback()
         flash('Une erreur est survenue lors de la suppression.', 'danger')
@@ -241,8 +291,20 @@ def profile():
 def search_surveys():
     form = SearchForm()
     keyword = request.args.get('keyword', '')
-    surveys = Survey.query.filter(Survey.title.contains(keyword)).all()
-    return render_template('survey/search.html', surveys=surveys, form=form)
+    page = max(request.args.get('page', 1, type=int), 1)
+    surveys, has_next = search(
+        keyword,
+        status=request.args.get('status'),
+        author=request.args.get('author'),
+        date_from=request.args.get('date_from', type=datetime.fromisoformat),
+        date_to=request.args.get('date_to', type=datetime.fromisoformat),
+        page=page,
+        per_page=page_size(request.args.get('per_page', type=int)))
+    return render_template('survey/search.html',
+                         surveys=surveys,
+                         form=form,
+                         page=page,
+                         has_next=has_next)
 
 # Routes d'analyse
 @app.route('/survey/<int:survey_id>/analytics')
@@ -252,22 +314,86 @@ def survey_analytics(survey_id):
     if survey.author_id != current_user.id and current_user.role != 'admin':
         flash('You cannot view these analytics.', 'danger')
         return redirect(url_for('index'))
-    responses = Response.query.filter_by(survey_id=survey_id).all()
-    # Traitement des données pour l'analyse
-    analytics_data = process_analytics(responses)
+    # Traitement des données pour l'analyse (calcul vectorisé, mis en cache)
+    job = None
+    key, analytics_data = cached_analytics(survey)
+    if analytics_data is None:
+        # Résultat d'une tâche terminée, éventuellement dans un autre worker
+        analytics_data = load_analytics_result(key)
+    if analytics_data is None:
+        if key[1] > app.config.get('ANALYTICS_SYNC_LIMIT', 50000):
+            # Trop de réponses pour calculer pendant la requête : tâche de fond
+            job = (find_active_job('analytics', survey_id) or
+                   submit_job('analytics', survey_id=survey_id, created_by=current_user.id))
+        else:
+            analytics_data = process_analytics(survey, key)
     return render_template('survey/analytics.html', 
                          survey=survey, 
-                         responses=responses,
-                         analytics=analytics_data)
-
-def process_analytics(responses):
-    # Logique de traitement des données pour l'analyse
-    # À implémenter selon vos besoins
-    return {}
+                         analytics=analytics_data,
+                         job=job)
 
 def is_admin():
     return current_user.is_authenticated and current_user.role == 'admin'
 
+def rebuild_state(survey_id):
+    """(id, état) du dernier recalcul des compteurs du sondage, ou None."""
+    job = latest_job('rebuild_results', survey_id)
+    return None if job is None else (job.id, job.status)
+
+def response_counts(surveys):
+    """Nombre de réponses par sondage, en une seule requête groupée."""
+    survey_ids = [survey.id for survey in surveys]
+    if not survey_ids:
+        return {}
+    rows = (db.session.query(Response.survey_id, func.count(Response.id))
+            .filter(Response.survey_id.in_(survey_ids))
+            .group_by(Response.survey_id))
+    return dict(rows)
+
+def survey_signature(surveys, counts):
+    """Ce qui, dans une liste de sondages, change l'affichage des cartes."""
+    return [(s.id, s.title, s.description, s.end_date, s.is_active, s.author.username,
+             counts.get(s.id, 0)) for s in surveys]
+
+@app.route('/admin/cache')
+@login_required
+def cache_stats():
+    if not is_admin():
+        abort(403)
+    return jsonify(surveys=survey_cache.stats())
+
+def survey_cache_metrics():
+    stats = survey_cache.stats()
+    fragments = fragment_cache.stats()
+    return ['# TYPE survey_cache_hits_total counter',
+            f'survey_cache_hits_total {stats["hits"]}',
+            '# TYPE survey_cache_misses_total counter',
+            f'survey_cache_misses_total {stats["misses"]}',
+            '# TYPE survey_cache_size gauge',
+            f'survey_cache_size {stats["size"]}',
+            '# TYPE fragment_cache_hits_total counter',
+            f'fragment_cache_hits_total {fragments["hits"]}',
+            '# TYPE fragment_cache_bytes gauge',
+            f'fragment_cache_bytes {fragments["bytes"]}']
+
+metrics.add_collector(survey_cache_metrics)
+
+@app.route('/admin/archive', methods=['POST'])
+@login_required
+def admin_archive():
+    if not is_admin():
+        abort(403)
+    days = request.form.get('days', app.config.get('ARCHIVE_RETENTION_DAYS', RETENTION_DAYS), type=int)
+    job = submit_job('archive_surveys', created_by=current_user.id, retention_days=days)
+    return jsonify(job.to_dict()), 202, {'Location': url_for('job_status', job_id=job.id)}
+
+@app.route('/admin/metrics')
+@login_required
+def admin_metrics():
+    if not is_admin():
+        abort(403)
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Ajout des routes pour les dashboards
 @app.route('/admin/dashboard')
 @login_required
@@ -276,15 +402,31 @@ def admin_dashboard():
         flash('Accès non autorisé.', 'danger')
         return redirect(url_for('index'))
     
-    # Récupérer tous les sondages avec leurs auteurs
-    my_surveys = Survey.query.filter_by(author_id=current_user.id).order_by(Survey.created_at.desc()).all()
-    all_surveys = Survey.query.order_by(Survey.created_at.desc()).all()
-    users = User.query.all()
+    # Récupérer les sondages avec leurs auteurs (chargés en une jointure), page par page
+    limit = page_size(request.args.get('per_page', type=int))
+    surveys_query = Survey.query.options(joinedload(Survey.author))
+    my_surveys = keyset_page(surveys_query.filter(Survey.author_id == current_user.id), Survey.id,
+                             request.args.get('mine'), limit, created_column=Survey.created_at)
+    all_surveys = keyset_page(surveys_query, Survey.id, request.args.get('all'), limit,
+                              created_column=Survey.created_at)
+    users = keyset_page(User.query, User.id, request.args.get('users'), limit)
+    counts = response_counts(my_surveys.items + all_surveys.items)
+
+    # Pas de nouveau rendu si le contenu de la page n'a pas changé
+    etag = make_etag(current_user.id, request.full_path,
+                     survey_signature(my_surveys.items + all_surveys.items, counts),
+                     [(user.id, user.username, user.email, user.role) for user in users.items])
+    if not_modified(etag):
+        return conditional_response(app, 304, etag)
     
-    return render_template('admin/dashboard2.html',
-                         my_surveys=my_surveys,
-                         all_surveys=all_surveys,
-                         users=users)
+    return conditional_response(app, render_template('admin/dashboard2.html',
+                         my_surveys=my_surveys.items,
+                         all_surveys=all_surveys.items,
+                         users=users.items,
+                         response_counts=counts,
+                         next_mine=my_surveys.next_cursor,
+                         next_all=all_surveys.next_cursor,
+                         next_users=users.next_cursor), etag)
 
 @app.route('/user/dashboard')
 @login_required
@@ -292,33 +434,162 @@ def user_dashboard():
     if current_user.role == 'admin':
         return redirect(url_for('admin_dashboard'))
     
+    limit = page_size(request.args.get('per_page', type=int))
+
     # Récupérer les sondages de l'utilisateur et les sondages disponibles
-    my_surveys = Survey.query.filter_by(author_id=current_user.id).order_by(Survey.created_at.desc()).all()
-    available_surveys = Survey.query.filter(
+    surveys_query = Survey.query.options(joinedload(Survey.author))
+    my_surveys = keyset_page(surveys_query.filter(Survey.author_id == current_user.id), Survey.id,
+                             request.args.get('mine'), limit, created_column=Survey.created_at)
+    available_surveys = keyset_page(surveys_query.filter(
         Survey.is_active == True,
         Survey.end_date > datetime.utcnow(),
         Survey.author_id != current_user.id
-    ).order_by(Survey.created_at.desc()).all()
+    ), Survey.id, request.args.get('available'), limit, created_column=Survey.created_at)
+    
+    # Récupérer les réponses de l'utilisateur avec le sondage associé
+    my_responses = keyset_page(
+        Response.query.options(joinedload(Response.survey)).filter_by(user_id=current_user.id),
+        Response.id, request.args.get('responses'), limit, created_column=Response.submitted_at)
     
-    # Récupérer les réponses de l'utilisateur
-    my_responses = Response.query.filter_by(user_id=current_user.id).order_by(Response.submitted_at.desc()).all()
+    counts = response_counts(my_surveys.items + available_surveys.items)
+
+    # Pas de nouveau rendu si le contenu de la page n'a pas changé
+    etag = make_etag(current_user.id, request.full_path,
+                     survey_signature(my_surveys.items + available_surveys.items, counts),
+                     [(r.id, r.submitted_at, r.survey.title) for r in my_responses.items])
+    if not_modified(etag):
+        return conditional_response(app, 304, etag)
     
-    return render_template('user/dashboard.html',
-                         my_surveys=my_surveys,
-                         available_surveys=available_surveys,
-                         my_responses=my_responses)
+    return conditional_response(app, render_template('user/dashboard.html',
+                         my_surveys=my_surveys.items,
+                         available_surveys=available_surveys.items,
+                         my_responses=my_responses.items,
+                         response_counts=counts,
+                         next_mine=my_surveys.next_cursor,
+                         next_available=available_surveys.next_cursor,
+                         next_responses=my_responses.next_cursor), etag)
 
 # Ajout d'une route pour voir les résultats d'un sondage
 @app.route('/survey/<int:survey_id>/results')
 @login_required
 def view_results(survey_id):
-    survey = Survey.query.get_or_404(survey_id)
+    survey = db.session.get(Survey, survey_id)
+    if survey is None:
+        return view_archived_results(survey_id)
     if survey.author_id != current_user.id and not current_user.role == 'admin':
         flash('Vous n\'êtes pas autorisé à voir ces résultats.', 'danger')
         return redirect(url_for('index'))
     
-    responses = Response.query.filter_by(survey_id=survey_id).all()
-    return render_template('survey/results.html', survey=survey, responses=responses)
+    # Réponse 304 sans relire les réponses si rien n'a changé
+    cursor = request.args.get('responses')
+    limit = page_size(request.args.get('per_page', type=int))
+    # Les compteurs changent aussi quand un recalcul (après modification) se termine
+    rebuild = rebuild_state(survey_id)
+    etag = survey_etag(survey, 'results', cursor, limit, rebuild)
+    if not_modified(etag):
+        return conditional_response(app, 304, etag)
+
+    # Compteurs pré-agrégés ; les réponses individuelles sont paginées
+    # (toutes à la fois : voir l'export)
+    responses = keyset_page(Response.query.filter_by(survey_id=survey_id), Response.id, cursor, limit,
+                            created_column=Response.submitted_at)
+    return conditional_response(app, render_template('survey/results.html',
+                           survey=survey,
+                           responses=responses.items,
+                           next_responses=responses.next_cursor,
+                           results=get_results(survey_id),
+                           text_stats=text_summaries(survey_id),
+                           rebuilding=rebuild is not None and rebuild[1] in (PENDING, RUNNING)),
+                           etag)
+
+def view_archived_results(survey_id):
+    archived = latest_archive(survey_id)
+    if archived is None:
+        abort(404)
+    if archived.author_id != current_user.id and not current_user.role == 'admin':
+        flash('Vous n\'êtes pas autorisé à voir ces résultats.', 'danger')
+        return redirect(url_for('index'))
+
+    # Une archive ne change plus : la validation ne dépend que du lecteur
+    etag = make_etag('archive', archived.archive_id, archived.archived_at, current_user.id)
+    if not_modified(etag, archived.archived_at):
+        return conditional_response(app, 304, etag, archived.archived_at)
+
+    # Les réponses individuelles restent disponibles via l'export
+    final = archived.get_results()
+    return conditional_response(app, render_template('survey/results.html',
+                           survey=archived,
+                           responses=[],
+                           results=final['tallies'],
+                           ratings=final['ratings'],
+                           text_stats=final.get('text_stats', {}),
+                           archived=True), etag, archived.archived_at)
+
+# Export des résultats en flux (CSV ou NDJSON, éventuellement compressé)
+@app.route('/survey/<int:survey_id>/export')
+@login_required
+def export_results(survey_id):
+    survey = db.session.get(Survey, survey_id) or latest_archive(survey_id)
+    if survey is None:
+        abort(404)
+    if survey.author_id != current_user.id and not current_user.role == 'admin':
+        flash('Vous n\'êtes pas autorisé à exporter ces résultats.', 'danger')
+        return redirect(url_for('index'))
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        abort(400)
+    compress = request.args.get('gzip') == '1'
+
+    filename = f'sondage_{survey_id}.{fmt}' + ('.gz' if compress else '')
+    if isinstance(survey, ArchivedSurvey):
+        # Lecture directe du fichier d'archive, en flux
+        return app.response_class(
+            generate_export(survey, fmt, compress=compress, rows=archive_rows(survey)),
+            mimetype='application/gzip' if compress else FORMATS[fmt],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+    # Les gros exports sont produits en tâche de fond puis téléchargés
+    response_count = Response.query.filter_by(survey_id=survey_id).count()
+    if request.args.get('async') == '1' or response_count > app.config.get('EXPORT_SYNC_LIMIT', 100000):
+        job = (find_active_job('export', survey_id, fmt=fmt, gzip=compress) or
+               submit_job('export', survey_id=survey_id, created_by=current_user.id,
+                          fmt=fmt, gzip=compress))
+        return jsonify(job.to_dict()), 202, {'Location': url_for('job_status', job_id=job.id)}
+
+    return app.response_class(
+        stream_with_context(generate_export(survey, fmt, compress=compress)),
+        mimetype='application/gzip' if compress else FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+# Suivi des tâches de fond
+def get_job_or_404(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None:
+        abort(404)
+    if job.created_by != current_user.id and not is_admin():
+        abort(403)
+    return job
+
+
+@app.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = requeue_if_stale(get_job_or_404(job_id))
+    data = job.to_dict()
+    if job.status == DONE and job.result_path:
+        data['download_url'] = url_for('job_download', job_id=job.id)
+    return jsonify(data)
+
+
+@app.route('/jobs/<job_id>/download')
+@login_required
+def job_download(job_id):
+    job = get_job_or_404(job_id)
+    if job.status != DONE or not job.result_path:
+        abort(404)
+    return send_file(job.result_path, as_attachment=True)
 
 
 @app.route('/survey/<int:survey_id>')
@@ -326,50 +597,101 @@ def view_results(survey_id):
 def view_survey(survey_id):
     survey = Survey.query.get_or_404(survey_id)
 
-    # Récupérer les réponses associées au sondage
-    responses = survey.responses
-
-    # Agrégation des résultats
-    results = {}
-
-    for response in responses:
-        answers = response.get_answers()  # Récupérer les réponses JSON
-
-        # Parcourir chaque question et réponse
-        for question, answer in answers.items():
-            # Si la réponse est une liste (choix multiples)
-            if isinstance(answer, list):
-                for option in answer:
-                    if question not in results:
-                        results[question] = {}
-                    if option not in results[question]:
-                        results[question][option] = 0
-                    results[question][option] += 1
-            else:
-                # Gestion des réponses simples
-                if question not in results:
-                    results[question] = {}
-                if answer not in results[question]:
-                    results[question][answer] = 0
-                results[question][answer] += 1
-
-    return render_template('survey/view.html',
+    rebuild = rebuild_state(survey_id)
+    etag = survey_etag(survey, 'view', rebuild)
+    if not_modified(etag):
+        return conditional_response(app, 304, etag)
+
+    # Résultats pré-agrégés, mis à jour à chaque soumission
+    results = get_results(survey_id)
+    ratings = rating_averages(survey_id)
+    # Questions libres : termes les plus fréquents et longueurs, sans relire les réponses
+    text_stats = text_summaries(survey_id)
+
+    return conditional_response(app, render_template('survey/view.html',
                            survey=survey,
-                           results=results)
+                           results=results,
+                           ratings=ratings,
+                           text_stats=text_stats,
+                           rebuilding=rebuild is not None and rebuild[1] in (PENDING, RUNNING)),
+                           etag)
+
+
+# Résultats en direct (Server-Sent Events) : un instantané puis les incréments
+@app.route('/survey/<int:survey_id>/live')
+@login_required
+def live_results(survey_id):
+    if get_definition(survey_id) is None:
+        abort(404)
+
+    def load_snapshot():
+        # Libérer la connexion SQL entre deux lectures, pendant toute la durée du flux
+        try:
+            return get_results(survey_id)
+        finally:
+            db.session.close()
+
+    # S'abonner avant de lire l'instantané pour ne manquer aucun incrément
+    subscriber = broker.subscribe(survey_id)
+    snapshot = load_snapshot()
+
+    return app.response_class(
+        stream_with_context(stream_results(survey_id, snapshot, subscriber, load_snapshot)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# Synchronisation en masse des réponses collectées hors ligne
+@app.route('/api/survey/<int:survey_id>/responses/bulk', methods=['POST'])
+@login_required
+def bulk_responses(survey_id):
+    survey = get_definition(survey_id)
+    if survey is None:
+        abort(404)
+    if survey.author_id != current_user.id and not is_admin():
+        abort(403)
+    if not survey.is_active:
+        return jsonify(error='Ce sondage n\'est plus disponible.'), 409
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error='Le corps de la requête doit être un objet JSON.'), 400
+    items = payload.get('responses')
+    if not isinstance(items, list):
+        return jsonify(error='Le champ "responses" doit être une liste.'), 400
+    if len(items) > app.config.get('BULK_MAX_ITEMS', 5000):
+        return jsonify(error='Trop de réponses dans un seul envoi.'), 413
+
+    # Seul un administrateur peut enregistrer des réponses au nom d'autres comptes :
+    # un auteur ne peut pas répondre à la place de vrais utilisateurs
+    statuses = bulk_save_responses(survey, items,
+                                   allowed_user_ids=None if is_admin() else {current_user.id})
+    created = sum(1 for status in statuses if status['status'] == CREATED)
+    if created:
+        fragment_cache.invalidate(survey_id)
+    for item, status in zip(items, statuses):
+        # L'identifiant local de la tablette est renvoyé tel quel
+        if isinstance(item, dict) and 'client_id' in item:
+            status['client_id'] = item['client_id']
+    return jsonify(created=created, results=statuses)
 
 
 @app.route('/survey/<int:survey_id>/take', methods=['GET', 'POST'])
 @login_required
 def take_survey(survey_id):
-    survey = Survey.query.get_or_404(survey_id)
+    # Structure du sondage depuis le cache : pas de requête ni de json.loads à chaque soumission
+    survey = get_definition(survey_id)
+    if survey is None:
+        abort(404)
     
     # Vérifier si le sondage est actif et non expiré
     if not survey.is_active or survey.is_expired():
         flash('Ce sondage n\'est plus disponible.', 'danger')
         return redirect(url_for('index'))
     
-    # Vérifier si l'utilisateur n'a pas déjà répondu
-    existing_response = Response.query.filter_by(
+    # Vérifier si l'utilisateur n'a pas déjà répondu (à l'affichage seulement :
+    # à la soumission, c'est la contrainte d'unicité qui rejette les doublons)
+    existing_response = request.method == 'GET' and Response.query.filter_by(
         survey_id=survey_id,
         user_id=current_user.id
     ).first()
@@ -395,18 +717,19 @@ def take_survey(survey_id):
                 # Vérifier si la réponse est fournie
                 if not answers[q_id]:
                     flash('Veuillez répondre à toutes les questions.', 'danger')
-                    return render_template('survey/take.html', survey=survey)
+                    return render_template('survey/take.html', survey=Survey.query.get_or_404(survey_id))
             
             # Créer la réponse
-            response = Response(
-                survey_id=survey_id,
-                user_id=current_user.id,
-                answers=json.dumps(answers)
-            )
-            
-            db.session.add(response)
-            db.session.commit()
+            status = save_response(survey_id, current_user.id, answers)
+            if status == DUPLICATE:
+                flash('Vous avez déjà répondu à ce sondage.', 'info')
+                return redirect(url_for('view_results', survey_id=survey_id))
+            fragment_cache.invalidate(survey_id)
             
+            if status == QUEUED:
+                flash('Merci pour votre participation! Votre réponse a bien été reçue '
+                      'et sera prise en compte dans quelques instants.', 'success')
+                return redirect(url_for('view_results', survey_id=survey_id))
             flash('Merci pour votre participation!', 'success')
             return redirect(url_for('view_results', survey_id=survey_id))
             
@@ -415,14 +738,64 @@ def take_survey(survey_id):
             flash('Une erreur est survenue. Veuillez réessayer.', 'danger')
             print(f"Erreur lors de la soumission du sondage: {str(e)}")
     
-    return render_template('survey/take.html', survey=survey)
+    # Le formulaire a besoin de l'objet complet (auteur, etc.)
+    return render_template('survey/take.html', survey=Survey.query.get_or_404(survey_id))
 
  
 @app.context_processor
 def utility_processor():
     def get_range(start, end):
         return list(range(start, end + 1))
-    return dict(get_range=get_range)
+
+    def survey_card(survey, response_count):
+        # La clé décrit tout ce qui est affiché : une carte périmée n'est jamais resservie
+        key = ('survey_card', survey.id, survey.title, survey.description, survey.end_date,
+               survey.author.username, response_count)
+        return fragment_cache.render(key, 'user/_survey_card.html',
+                                     survey=survey, response_count=response_count)
+    return dict(get_range=get_range, survey_card=survey_card)
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Crée toutes les tables d'une base neuve et la marque à jour des migrations."""
+    db.create_all()
+    stamp()
+    click.echo('Base de données créée.')
+
+@app.cli.command('rebuild-tallies')
+@click.argument('survey_id', type=int, required=False)
+def rebuild_tallies_command(survey_id):
+    """Recalcule les compteurs de résultats (tous les sondages par défaut).
+
+    Nécessite que la table response_answer soit remplie (`flask db upgrade`).
+    """
+    survey_ids = [survey_id] if survey_id else [s.id for s in Survey.query.with_entities(Survey.id)]
+    for sid in survey_ids:
+        rebuild_results(db.session.get(Survey, sid))
+        db.session.commit()
+    click.echo(f'{len(survey_ids)} sondage(s) recalculé(s).')
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Reconstruit l'index de recherche plein texte des sondages."""
+    rebuild_index()
+    db.session.commit()
+    click.echo('Index de recherche reconstruit.')
+
+@app.cli.command('archive-surveys')
+@click.option('--days', type=int, default=None, help='Délai de rétention après la date de fin.')
+def archive_surveys_command(days):
+    """Archive sur disque les sondages expirés depuis plus de --days jours."""
+    if days is None:
+        days = app.config.get('ARCHIVE_RETENTION_DAYS', RETENTION_DAYS)
+    archived = archive_expired(days)
+    click.echo(f'{len(archived)} sondage(s) archivé(s).')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Construit static/dist : fichiers empreintés et pré-compressés (gzip/brotli)."""
+    manifest = build(app.root_path)
+    click.echo(f'{len(manifest)} fichier(s) publié(s) dans static/dist.')
 
 if __name__ == '__main__':
     with app.app_context():
@@ -0,0 +1,180 @@
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+
+from answers import rating_averages
+from jobs import job_handler, purge_survey, set_progress
+from models import db, Survey, Response
+from tallies import get_results
+from textstats import text_summaries
+
+RETENTION_DAYS = 180
+BATCH_SIZE = 5000
+
+
+class ArchivedSurvey(db.Model):
+    """Sondage archivé : métadonnées et résultats finaux en base, réponses sur disque.
+
+    Expose la même interface minimale que `Survey` (`id`, `get_questions`,
+    `is_expired`...) pour être affiché et exporté par les mêmes vues. `id`
+    est l'identifiant du sondage d'origine : SQLite le réattribue à un nouveau
+    sondage une fois celui-ci supprimé, l'archive a donc sa propre clé et
+    un sondage est identifié par (id, created_at).
+    """
+    __tablename__ = 'archived_survey'
+    __table_args__ = (
+        db.Index('ix_archived_survey_survey', 'id', 'created_at'),
+    )
+
+    archive_id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    questions = db.Column(db.Text, nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    created_at = db.Column(db.DateTime)
+    end_date = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    response_count = db.Column(db.Integer, nullable=False, default=0)
+    results = db.Column(db.Text, nullable=False, default='{}')
+    path = db.Column(db.String(512), nullable=False)
+
+    is_active = False
+
+    def get_questions(self):
+        return json.loads(self.questions)
+
+    def get_results(self):
+        return json.loads(self.results)
+
+    def is_expired(self):
+        return True
+
+
+def archive_dir(app):
+    path = app.config.get('ARCHIVE_DIR') or os.path.join(app.instance_path, 'archive')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_archive(survey, path):
+    """Écrit les réponses du sondage dans un fichier .npz compressé, une colonne par question.
+
+    Les notes sont stockées en flottants (NaN si absentes), les autres
+    réponses en chaînes JSON pour conserver listes et valeurs nulles.
+    """
+    questions = survey.get_questions()
+    ids, user_ids, submitted = [], [], []
+    columns = {str(q['id']): [] for q in questions}
+    rows = (db.session.query(Response.id, Response.user_id, Response.submitted_at, Response.answers)
+            .filter(Response.survey_id == survey.id)
+            .order_by(Response.id)
+            .yield_per(BATCH_SIZE))
+    for response_id, user_id, submitted_at, raw in rows:
+        answers = json.loads(raw or '{}')
+        ids.append(response_id)
+        user_ids.append(user_id)
+        submitted.append(submitted_at)
+        for q_id, column in columns.items():
+            column.append(answers.get(q_id))
+
+    arrays = {
+        'response_id': np.array(ids, dtype=np.int64),
+        'user_id': np.array(user_ids, dtype=np.int64),
+        'submitted_at': np.array(submitted, dtype='datetime64[s]'),
+    }
+    for question in questions:
+        q_id = str(question['id'])
+        if question['type'] == 'rating':
+            arrays[f'q_{q_id}'] = np.array(
+                [v if isinstance(v, (int, float)) else np.nan for v in columns[q_id]], dtype=np.float64)
+        else:
+            arrays[f'q_{q_id}'] = np.array([json.dumps(v, ensure_ascii=False) for v in columns[q_id]],
+                                           dtype=np.str_)
+
+    # Écriture dans un fichier temporaire puis renommage : jamais d'archive partielle
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+    return len(ids)
+
+
+def archive_rows(archived):
+    """Relit les réponses d'une archive : (id, user_id, submitted_at, réponses)."""
+    questions = archived.get_questions()
+    with np.load(archived.path) as data:
+        ids = data['response_id']
+        user_ids = data['user_id']
+        submitted = data['submitted_at']
+        columns = {str(q['id']): (q['type'], data[f'q_{q["id"]}']) for q in questions}
+        for i in range(ids.size):
+            answers = {}
+            for q_id, (kind, column) in columns.items():
+                if kind == 'rating':
+                    answers[q_id] = None if np.isnan(column[i]) else int(column[i])
+                else:
+                    answers[q_id] = json.loads(str(column[i]))
+            submitted_at = None if np.isnat(submitted[i]) else submitted[i].astype(datetime)
+            yield int(ids[i]), int(user_ids[i]), submitted_at, answers
+
+
+def latest_archive(survey_id):
+    """Archive la plus récente portant cet identifiant de sondage, ou None."""
+    return (ArchivedSurvey.query.filter_by(id=survey_id)
+            .order_by(ArchivedSurvey.archived_at.desc(), ArchivedSurvey.archive_id.desc())
+            .first())
+
+
+def archive_survey(survey):
+    """Archive un sondage : fichier de réponses, résultats finaux, puis purge des tables."""
+    # Archive de ce même sondage déjà écrite lors d'un passage interrompu :
+    # il ne reste qu'à purger
+    existing = ArchivedSurvey.query.filter_by(id=survey.id, created_at=survey.created_at).first()
+    if existing is not None:
+        purge_survey(survey.id)
+        return
+
+    # Nom unique : un sondage réutilisant l'identifiant n'écrase pas l'archive précédente
+    path = os.path.join(archive_dir(current_app), f'survey_{survey.id}_{uuid.uuid4().hex[:12]}.npz')
+    count = write_archive(survey, path)
+    db.session.add(ArchivedSurvey(
+        id=survey.id,
+        title=survey.title,
+        description=survey.description,
+        questions=survey.questions,
+        author_id=survey.author_id,
+        created_at=survey.created_at,
+        end_date=survey.end_date,
+        response_count=count,
+        results=json.dumps({'tallies': get_results(survey.id),
+                            'ratings': rating_averages(survey.id),
+                            'text_stats': text_summaries(survey.id)}, ensure_ascii=False),
+        path=path,
+    ))
+    db.session.commit()
+    purge_survey(survey.id)
+
+
+def expired_surveys(retention_days=RETENTION_DAYS):
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return Survey.query.filter(Survey.end_date < cutoff).order_by(Survey.id)
+
+
+def archive_expired(retention_days=RETENTION_DAYS, on_progress=None):
+    """Archive tous les sondages expirés depuis plus de `retention_days` jours."""
+    survey_ids = [row.id for row in expired_surveys(retention_days).with_entities(Survey.id)]
+    for index, survey_id in enumerate(survey_ids, 1):
+        archive_survey(db.session.get(Survey, survey_id))
+        if on_progress is not None:
+            on_progress(index / len(survey_ids))
+    return survey_ids
+
+
+@job_handler('archive_surveys')
+def archive_job(job, retention_days=RETENTION_DAYS):
+    archive_expired(retention_days, lambda progress: set_progress(job, progress))
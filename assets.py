@@ -0,0 +1,172 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : seules les variantes gzip sont produites
+    brotli = None
+
+# Répertoires sources -> préfixe des noms logiques
+SOURCES = (
+    ('static', ''),
+    ('templates/lib', 'theme/lib/'),
+    ('templates/css', 'theme/css/'),
+    ('templates/js', 'theme/js/'),
+    ('templates/img', 'theme/img/'),
+)
+ASSET_EXTENSIONS = {'.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico',
+                    '.woff', '.woff2', '.ttf', '.eot'}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ttf', '.eot', '.ico'}
+DIST_DIR = 'static/dist'
+MANIFEST = 'manifest.json'
+FAR_FUTURE = 'public, max-age=31536000, immutable'
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def _fingerprint(name, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    root, ext = posixpath.splitext(name)
+    return f'{root}.{digest}{ext}'
+
+
+def _rewrite_css(name, css, manifest):
+    """Remplace les url() relatives d'une feuille de style par les noms empreintés."""
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, target = match.groups()
+        if target.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path, _, suffix = target.partition('?')
+        resolved = posixpath.normpath(posixpath.join(base, path))
+        if resolved not in manifest:
+            return match.group(0)
+        new_target = posixpath.relpath(manifest[resolved], base) + (f'?{suffix}' if suffix else '')
+        return f'url({quote}{new_target}{quote})'
+
+    return _CSS_URL.sub(replace, css)
+
+
+def _write(dist, name, data):
+    path = os.path.join(dist, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if posixpath.splitext(name)[1] not in COMPRESSIBLE:
+        return
+    # Variantes pré-compressées, gardées seulement si elles sont plus petites
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(compressed)
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + '.br', 'wb') as f:
+                f.write(compressed)
+
+
+def collect(root):
+    """Retourne {nom logique: chemin source} pour tous les fichiers à publier."""
+    files = {}
+    for directory, prefix in SOURCES:
+        source = os.path.join(root, directory)
+        for dirpath, dirnames, filenames in os.walk(source):
+            # Ne pas republier une version déjà construite
+            dirnames[:] = [d for d in dirnames if os.path.join(dirpath, d) != os.path.join(root, DIST_DIR)]
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() not in ASSET_EXTENSIONS:
+                    continue
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, source).replace(os.sep, '/')
+                files[prefix + relative] = path
+    return files
+
+
+def build(root):
+    """Construit static/dist : fichiers empreintés, variantes .gz/.br et manifeste."""
+    dist = os.path.join(root, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    files = collect(root)
+    manifest = {}
+
+    # Les feuilles de style sont traitées en dernier pour pointer vers les noms empreintés
+    for name in sorted(files, key=lambda n: n.endswith('.css')):
+        with open(files[name], 'rb') as f:
+            data = f.read()
+        if name.endswith('.css'):
+            data = _rewrite_css(name, data.decode('utf-8'), manifest).encode('utf-8')
+        manifest[name] = _fingerprint(name, data)
+        _write(dist, manifest[name], data)
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class Assets:
+    """Sert les fichiers construits avec un cache long et la meilleure compression acceptée.
+
+    Sans build (développement), `asset_url` renvoie le fichier source,
+    servi sans empreinte ni cache long.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = app.root_path
+        self.dist = os.path.join(app.root_path, DIST_DIR)
+        manifest_path = os.path.join(self.dist, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        self.fingerprinted = set(self.manifest.values())
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+        app.extensions['assets'] = self
+
+    def url(self, name):
+        return url_for('assets', filename=self.manifest.get(name, name))
+
+    def _source(self, filename):
+        for directory, prefix in SOURCES:
+            if prefix and filename.startswith(prefix):
+                return os.path.join(self.root, directory, *filename[len(prefix):].split('/'))
+        return os.path.join(self.root, 'static', *filename.split('/'))
+
+    def serve(self, filename):
+        if '..' in filename.split('/'):
+            return 'Not Found', 404
+        if filename not in self.fingerprinted:
+            # Sources non construites : uniquement les types de fichiers publiés
+            if os.path.splitext(filename)[1].lower() not in ASSET_EXTENSIONS:
+                return 'Not Found', 404
+            path = self._source(filename)
+            if not os.path.isfile(path):
+                return 'Not Found', 404
+            return send_file(path, max_age=0)
+
+        path = os.path.join(self.dist, *filename.split('/'))
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for candidate, extension in (('br', '.br'), ('gzip', '.gz')):
+            if candidate in request.accept_encodings and os.path.exists(path + extension):
+                path, encoding = path + extension, candidate
+                break
+        response = send_file(path, mimetype=mimetype, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = FAR_FUTURE
+        response.vary.add('Accept-Encoding')
+        return response
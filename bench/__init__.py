@@ -0,0 +1,8 @@
+"""Banc de performance de l'application.
+
+Remplit la base configurée avec des données synthétiques (`bench.seed`)
+puis mesure les routes principales via le client de test Flask
+(`bench.runner`). Utilisation :
+
+    python -m bench --responses 1000,100000 --reset
+"""
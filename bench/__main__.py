@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+
+from app import app, db
+from bench import runner
+from bench.seed import seed
+from models import User
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench',
+                                     description='Mesure débit, latence et requêtes SQL par route.')
+    parser.add_argument('--responses', default='1000',
+                        help='échelles à tester, séparées par des virgules (ex. 1000,100000,1000000)')
+    parser.add_argument('--surveys', type=int, default=50)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=200, help='requêtes par route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--routes', help='routes à mesurer, séparées par des virgules')
+    parser.add_argument('--group-commit', action='store_true',
+                        help="active l'écriture groupée des réponses (INGEST_GROUP_COMMIT)")
+    parser.add_argument('--reset', action='store_true',
+                        help='vide la base configurée avant de la remplir')
+    parser.add_argument('--json', dest='json_path', help='écrit aussi le rapport en JSON')
+    return parser.parse_args(argv)
+
+
+def reset_database():
+    db.drop_all()
+    db.create_all()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scales = [int(value) for value in args.responses.split(',')]
+    routes = set(args.routes.split(',')) if args.routes else None
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['INGEST_GROUP_COMMIT'] = args.group_commit
+
+    report = []
+    for index, scale in enumerate(scales):
+        with app.app_context():
+            # Ne jamais écraser une base existante sans demande explicite
+            if index == 0 and not args.reset and User.query.first() is not None:
+                sys.exit(f"La base {db.engine.url} n'est pas vide : relancer avec --reset.")
+            if index > 0 or args.reset:
+                reset_database()
+            data = seed(scale, surveys=args.surveys, users=args.users)
+        results = runner.run(data, requests=args.requests, concurrency=args.concurrency,
+                             routes=routes)
+        print(runner.format_report(scale, results))
+        report.append({'responses': scale, 'results': results})
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app
+from bench.seed import create_users, make_answers
+from survey_cache import get_definition
+
+_local = threading.local()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    _local.queries = getattr(_local, 'queries', 0) + 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Scenario:
+    """Une route à mesurer : comment construire l'URL, l'utilisateur et le corps."""
+
+    def __init__(self, name, url, user, method='GET', data=None, concurrent=True):
+        self.name = name
+        self.url = url
+        self.user = user
+        self.method = method
+        self.data = data
+        self.concurrent = concurrent
+
+
+def _login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def run_scenario(scenario, requests, concurrency):
+    """Exécute `requests` appels et retourne les métriques de la route."""
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+    counter = count()
+    workers = concurrency if scenario.concurrent else 1
+
+    def worker():
+        client = app.test_client()
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            _login(client, scenario.user(i))
+            _local.queries = 0
+            started = time.perf_counter()
+            response = client.open(scenario.url(i), method=scenario.method,
+                                   data=scenario.data(i) if scenario.data else None)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                queries.append(_local.queries)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(workers):
+            pool.submit(worker)
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'route': scenario.name,
+        'requests': requests,
+        'concurrency': workers,
+        'throughput': requests / duration if duration else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries_per_request': sum(queries) / len(queries) if queries else 0.0,
+        'errors': len(errors),
+    }
+
+
+def build_scenarios(data, requests):
+    survey_ids = data['survey_ids']
+    active_ids = data['active_survey_ids'] or survey_ids
+    user_ids = data['user_ids']
+    admin_id = data['admin_id']
+
+    # Des répondants neufs pour ne jamais tomber sur la contrainte d'unicité
+    with app.app_context():
+        takers = [user.id for user in create_users(f'bench_taker_{time.time_ns()}_', requests)]
+        questions = {sid: get_definition(sid).questions for sid in active_ids}
+
+    def take_data(i):
+        survey_id = active_ids[i % len(active_ids)]
+        answers = make_answers(random.Random(i), questions[survey_id])
+        return {f'question_{q_id}': value for q_id, value in answers.items()}
+
+    def author(i):
+        return admin_id
+
+    return [
+        Scenario('take_survey', lambda i: f'/survey/{active_ids[i % len(active_ids)]}/take',
+                 lambda i: takers[i], method='POST', data=take_data),
+        Scenario('view_survey', lambda i: f'/survey/{survey_ids[i % len(survey_ids)]}', author),
+        Scenario('view_results', lambda i: f'/survey/{survey_ids[i % len(survey_ids)]}/results', author),
+        Scenario('user_dashboard', lambda i: '/user/dashboard', lambda i: user_ids[i % len(user_ids)]),
+        Scenario('admin_dashboard', lambda i: '/admin/dashboard', author),
+        Scenario('search_surveys', lambda i: '/search?keyword=satisfaction', author),
+    ]
+
+
+def run(data, requests=200, concurrency=8, routes=None):
+    results = []
+    for scenario in build_scenarios(data, requests):
+        if routes and scenario.name not in routes:
+            continue
+        results.append(run_scenario(scenario, requests, concurrency))
+    return results
+
+
+def format_report(scale, results):
+    lines = [f'== {scale} réponses ==',
+             f'{"route":<16}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+             f'{"SQL/req":>10}{"erreurs":>10}']
+    for r in results:
+        lines.append(f'{r["route"]:<16}{r["throughput"]:>10.1f}{r["p50_ms"]:>10.1f}'
+                     f'{r["p95_ms"]:>10.1f}{r["p99_ms"]:>10.1f}'
+                     f'{r["queries_per_request"]:>10.1f}{r["errors"]:>10}')
+    return '\n'.join(lines)
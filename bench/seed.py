@@ -0,0 +1,119 @@
+import json
+import math
+import random
+from datetime import datetime, timedelta
+
+from app import db
+from answers import ResponseAnswer, answer_rows
+from models import User, Survey, Response
+from search import rebuild_index
+from tallies import rebuild_results
+
+BATCH_SIZE = 5000
+CHOICES = ['Très satisfait', 'Satisfait', 'Neutre', 'Insatisfait', 'Très insatisfait']
+WORDS = ('service rapide accueil prix qualité livraison personnel attente produit '
+         'application conseil propre agréable cher lent efficace').split()
+
+
+def make_questions(rng, count=6):
+    """Questions de types mélangés : choix, note et texte libre."""
+    questions = []
+    for i in range(count):
+        kind = ('choice', 'rating', 'text')[i % 3]
+        question = {'id': str(i), 'text': f'Question {i} ({kind})', 'type': kind}
+        if kind == 'choice':
+            question['choices'] = rng.sample(CHOICES, rng.randint(2, len(CHOICES)))
+        questions.append(question)
+    return questions
+
+
+def make_answers(rng, questions):
+    answers = {}
+    for question in questions:
+        if question['type'] == 'choice':
+            answers[question['id']] = rng.choice(question['choices'])
+        elif question['type'] == 'rating':
+            answers[question['id']] = rng.randint(1, 5)
+        else:
+            answers[question['id']] = ' '.join(rng.choices(WORDS, k=rng.randint(2, 12)))
+    return answers
+
+
+def create_users(prefix, count):
+    users = []
+    for i in range(count):
+        user = User(username=f'{prefix}{i}', email=f'{prefix}{i}@bench.local', role='user')
+        user.password = 'bench'
+        users.append(user)
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def seed(total_responses, surveys=50, users=2000, seed=42):
+    """Crée utilisateurs, sondages et `total_responses` réponses réparties.
+
+    Les réponses sont insérées en masse (Core) avec des identifiants
+    explicites pour pouvoir écrire les lignes normalisées dans la foulée.
+    Retourne un dict décrivant les données créées.
+    """
+    rng = random.Random(seed)
+    per_survey = math.ceil(total_responses / surveys)
+    # Une seule réponse par utilisateur et par sondage
+    users = max(users, per_survey)
+
+    admin = User(username='bench_admin', email='bench_admin@bench.local', role='admin')
+    admin.password = 'bench'
+    db.session.add(admin)
+    user_objects = create_users('bench_user_', users)
+    user_ids = [user.id for user in user_objects]
+
+    now = datetime.utcnow()
+    survey_objects = []
+    for i in range(surveys):
+        survey_objects.append(Survey(
+            title=f'Sondage de satisfaction {i} {rng.choice(WORDS)}',
+            description=' '.join(rng.choices(WORDS, k=8)),
+            questions=json.dumps(make_questions(rng)),
+            end_date=now + timedelta(days=rng.randint(-30, 60)),
+            author_id=rng.choice(user_ids),
+            is_active=True,
+        ))
+    db.session.add_all(survey_objects)
+    db.session.commit()
+
+    next_id = (db.session.query(db.func.max(Response.id)).scalar() or 0) + 1
+    response_table, answer_table = Response.__table__, ResponseAnswer.__table__
+    remaining = total_responses
+    for survey in survey_objects:
+        count = min(per_survey, remaining)
+        remaining -= count
+        questions = survey.get_questions()
+        respondents = rng.sample(user_ids, count)
+        for start in range(0, count, BATCH_SIZE):
+            responses, answers = [], []
+            for user_id in respondents[start:start + BATCH_SIZE]:
+                values = make_answers(rng, questions)
+                responses.append({
+                    'id': next_id, 'survey_id': survey.id, 'user_id': user_id,
+                    'answers': json.dumps(values),
+                    'submitted_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+                })
+                answers.extend(dict(row, response_id=next_id)
+                               for row in answer_rows(survey.id, values))
+                next_id += 1
+            db.session.execute(response_table.insert(), responses)
+            db.session.execute(answer_table.insert(), answers)
+            db.session.commit()
+        rebuild_results(survey)
+        db.session.commit()
+
+    rebuild_index()
+    db.session.commit()
+    return {
+        'admin_id': admin.id,
+        'user_ids': user_ids,
+        'survey_ids': [survey.id for survey in survey_objects],
+        'active_survey_ids': [s.id for s in survey_objects if s.end_date > now],
+        'responses': total_responses,
+    }
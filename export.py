@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import zlib
+
+from models import db, Response
+
+BATCH_SIZE = 1000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _rows(survey, batch_size=BATCH_SIZE):
+    """Parcourt les réponses côté serveur, par lots, sans tout charger en mémoire."""
+    query = (db.session.query(Response.id, Response.user_id, Response.submitted_at, Response.answers)
+             .filter(Response.survey_id == survey.id)
+             .order_by(Response.id)
+             .execution_options(stream_results=True)
+             .yield_per(batch_size))
+    for response_id, user_id, submitted_at, raw in query:
+        yield response_id, user_id, submitted_at, json.loads(raw or '{}')
+
+
+def _flatten(value):
+    # Les réponses à choix multiples sont jointes dans une seule cellule
+    if isinstance(value, list):
+        return ';'.join(str(v) for v in value)
+    return '' if value is None else value
+
+
+def generate_csv(survey, rows, batch_size=BATCH_SIZE):
+    questions = survey.get_questions()
+    question_ids = [str(q['id']) for q in questions]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    # L'en-tête part immédiatement, avant la première requête sur les réponses
+    writer.writerow(['response_id', 'user_id', 'submitted_at'] + [q['text'] for q in questions])
+    yield flush()
+
+    for count, (response_id, user_id, submitted_at, answers) in enumerate(rows, 1):
+        writer.writerow([response_id, user_id, submitted_at.isoformat() if submitted_at else ''] +
+                        [_flatten(answers.get(q_id)) for q_id in question_ids])
+        # On envoie un bloc par lot plutôt qu'une ligne à la fois
+        if count % batch_size == 0:
+            yield flush()
+    yield flush()
+
+
+def generate_ndjson(survey, rows, batch_size=BATCH_SIZE):
+    question_ids = [str(q['id']) for q in survey.get_questions()]
+    lines = []
+    for response_id, user_id, submitted_at, answers in rows:
+        lines.append(json.dumps({
+            'response_id': response_id,
+            'user_id': user_id,
+            'submitted_at': submitted_at.isoformat() if submitted_at else None,
+            'answers': {q_id: answers.get(q_id) for q_id in question_ids},
+        }, ensure_ascii=False))
+        if len(lines) == batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_stream(chunks):
+    """Compresse un flux de chaînes au format gzip, bloc par bloc."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def generate_export(survey, fmt, compress=False, batch_size=BATCH_SIZE, rows=None):
+    """Flux d'export ; `rows` permet d'exporter une autre source (archive)."""
+    if rows is None:
+        rows = _rows(survey, batch_size)
+    if fmt == 'csv':
+        chunks = generate_csv(survey, rows, batch_size)
+    else:
+        chunks = generate_ndjson(survey, rows, batch_size)
+    if compress:
+        return gzip_stream(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
@@ -0,0 +1,30 @@
+# Configuration gunicorn pour la production : gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+
+# 2 × cœurs + 1 processus (pré-fork), avec des threads par worker. Chaque
+# abonné à /survey/<id>/live occupe un thread pendant toute sa connexion :
+# WEB_THREADS doit couvrir les abonnés attendus par worker plus une marge
+# pour les requêtes ordinaires.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 64))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Le code est chargé une fois dans le maître puis partagé par fork
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Chaque worker repart d'un pool de connexions vide : les connexions
+    # ouvertes par le maître ne doivent jamais être partagées entre processus
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,114 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import render_template, request, session
+from markupsafe import Markup
+
+from models import db, Response
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def latest_response_id(survey_id):
+    """Identifiant de la dernière réponse, via l'index plutôt qu'un COUNT."""
+    return (db.session.query(Response.id)
+            .filter(Response.survey_id == survey_id)
+            .order_by(Response.id.desc())
+            .limit(1)
+            .scalar())
+
+
+def survey_etag(survey, *extra):
+    """ETag d'une page de sondage : contenu du sondage, dernière réponse et lecteur.
+
+    Pas de Last-Modified : aucune date fiable ne couvre à la fois les
+    modifications du sondage et les réponses (une synchronisation hors ligne
+    peut insérer des réponses datées d'avant la dernière).
+    """
+    return make_etag(survey.id, survey.title, survey.description, survey.questions,
+                     survey.end_date, survey.is_active, latest_response_id(survey.id),
+                     current_user_id(), *extra)
+
+
+def current_user_id():
+    # Les pages varient selon l'utilisateur connecté (menu, droits)
+    return session.get('_user_id')
+
+
+def not_modified(etag, last_modified=None):
+    """True si le client a déjà cette version de la page.
+
+    Un message flash en attente doit être affiché : on renvoie alors la page.
+    """
+    if session.get('_flashes'):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional_response(app, body_or_status, etag, last_modified=None):
+    """Ajoute ETag / Last-Modified ; body_or_status=304 produit une réponse vide."""
+    if body_or_status == 304:
+        response = app.response_class(status=304)
+    else:
+        response = app.make_response(body_or_status)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Le contenu est propre à l'utilisateur : pas de cache partagé, revalidation systématique
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class FragmentCache:
+    """Cache LRU de fragments HTML rendus, borné en nombre d'octets.
+
+    Les clés commencent par (nom, survey_id) pour pouvoir invalider tous
+    les fragments d'un sondage ; le reste de la clé décrit l'état rendu.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, key, template, **context):
+        with self.lock:
+            html = self.entries.get(key)
+            if html is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return Markup(html)
+            self.misses += 1
+
+        html = render_template(template, **context)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = html
+                self.size += len(html)
+            while self.size > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        return Markup(html)
+
+    def invalidate(self, survey_id):
+        with self.lock:
+            for key in [k for k in self.entries if k[1] == survey_id]:
+                self.size -= len(self.entries.pop(key))
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self.entries), 'bytes': self.size}
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,339 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+
+from answers import ResponseAnswer, answer_rows
+from live import broker, merge_counts
+from models import db, User, Response
+from survey_cache import get_definition
+from tallies import count_answers, increment_tallies
+from textstats import update_text_stats
+
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+# Réponse confiée au thread d'écriture, pas encore validée au bout du délai d'attente
+QUEUED = 'queued'
+
+RATING_RANGE = range(1, 6)
+
+# Un seul envoi par utilisateur et par sondage, garanti par la base
+db.Index('uq_response_survey_user', Response.survey_id, Response.user_id, unique=True)
+
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',
+)
+
+
+def configure_sqlite(engine):
+    """Active le mode WAL et les pragmas d'écriture sur chaque connexion SQLite."""
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def split_answers(survey_id, answers):
+    """Sépare les réponses comptées par option des réponses libres (questions texte)."""
+    definition = get_definition(survey_id)
+    text_ids = {str(q['id']) for q in definition.questions if q['type'] == 'text'} if definition else set()
+    counted = {q_id: value for q_id, value in answers.items() if q_id not in text_ids}
+    texts = {q_id: value for q_id, value in answers.items() if q_id in text_ids and value}
+    return counted, texts
+
+
+def collect_texts(texts, answers):
+    for q_id, value in answers.items():
+        texts.setdefault(q_id, []).append(value)
+
+
+def add_response(survey_id, user_id, answers, submitted_at=None, texts=None):
+    """Ajoute la réponse, ses lignes normalisées et les compteurs à la session.
+
+    Ne fait pas de commit. Retourne les incréments appliqués aux compteurs.
+    Les réponses libres mettent à jour l'index de termes, ou sont ajoutées à
+    `texts` ({question: [textes]}) pour une mise à jour groupée par l'appelant.
+    """
+    response = Response(survey_id=survey_id, user_id=user_id, answers=json.dumps(answers))
+    if submitted_at is not None:
+        response.submitted_at = submitted_at
+    db.session.add(response)
+    for row in answer_rows(survey_id, answers):
+        db.session.add(ResponseAnswer(response=response, **row))
+    counted, free_texts = split_answers(survey_id, answers)
+    counts = count_answers(counted)
+    increment_tallies(survey_id, counts)
+    if texts is None:
+        update_text_stats(survey_id, {q_id: [value] for q_id, value in free_texts.items()})
+    else:
+        collect_texts(texts, free_texts)
+    return counts
+
+
+def _commit_one(survey_id, user_id, answers, submitted_at=None):
+    try:
+        counts = add_response(survey_id, user_id, answers, submitted_at)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return DUPLICATE
+    broker.publish(survey_id, counts)
+    return CREATED
+
+
+class ResponseWriter:
+    """Écrit les réponses soumises par lots, avec un seul commit par lot.
+
+    Les requêtes déposent leur réponse dans une file et attendent le
+    résultat (`CREATED` ou `DUPLICATE`) via un `Future`. Un thread unique
+    vide la file toutes les `max_wait` secondes ou dès `max_batch` éléments.
+    """
+
+    def __init__(self, app, max_batch=200, max_wait=0.01):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='response-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, survey_id, user_id, answers):
+        future = Future()
+        self.queue.put((survey_id, user_id, answers, future))
+        return future
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            with self.app.app_context():
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    for *_, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                finally:
+                    db.session.remove()
+
+    def _write(self, batch):
+        # Doublons déjà en base : une seule requête pour tout le lot
+        survey_ids = {item[0] for item in batch}
+        user_ids = {item[1] for item in batch}
+        existing = set(db.session.query(Response.survey_id, Response.user_id)
+                       .filter(Response.survey_id.in_(survey_ids),
+                               Response.user_id.in_(user_ids)))
+
+        pending = []
+        deltas, texts = {}, {}
+        for survey_id, user_id, answers, future in batch:
+            if (survey_id, user_id) in existing:
+                future.set_result(DUPLICATE)
+                continue
+            existing.add((survey_id, user_id))
+            merge_counts(deltas.setdefault(survey_id, {}),
+                         add_response(survey_id, user_id, answers, texts=texts.setdefault(survey_id, {})))
+            pending.append((survey_id, user_id, answers, future))
+
+        try:
+            # Index de termes : une mise à jour par question libre et par lot
+            for survey_id, survey_texts in texts.items():
+                update_text_stats(survey_id, survey_texts)
+            db.session.commit()
+        except IntegrityError:
+            # Conflit avec un autre processus : on rejoue le lot un par un
+            db.session.rollback()
+            for survey_id, user_id, answers, future in pending:
+                future.set_result(_commit_one(survey_id, user_id, answers))
+            return
+        # Un seul message par sondage et par lot pour les abonnés en direct
+        for survey_id, delta in deltas.items():
+            broker.publish(survey_id, delta)
+        for *_, future in pending:
+            future.set_result(CREATED)
+
+
+_writer_lock = threading.Lock()
+
+
+def get_writer(app):
+    writer = app.extensions.get('response_writer')
+    if writer is None:
+        with _writer_lock:
+            writer = app.extensions.get('response_writer')
+            if writer is None:
+                writer = app.extensions['response_writer'] = ResponseWriter(
+                    app,
+                    max_batch=app.config.get('INGEST_MAX_BATCH', 200),
+                    max_wait=app.config.get('INGEST_MAX_WAIT', 0.01))
+    return writer
+
+
+def save_response(survey_id, user_id, answers):
+    """Enregistre une réponse et retourne `CREATED`, `DUPLICATE` ou `QUEUED`.
+
+    Avec `INGEST_GROUP_COMMIT`, la réponse passe par le thread d'écriture
+    groupée ; sinon elle est validée directement dans la requête. `QUEUED`
+    signifie que la réponse est toujours dans la file au bout de
+    `INGEST_TIMEOUT` secondes : elle sera validée (ou rejetée comme doublon)
+    plus tard.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('INGEST_GROUP_COMMIT'):
+        return _commit_one(survey_id, user_id, answers)
+    future = get_writer(app).submit(survey_id, user_id, answers)
+    # Rendre la connexion au pool pendant l'attente : le thread d'écriture en a
+    # besoin, et chaque requête en attente en garderait une sinon
+    db.session.close()
+    try:
+        return future.result(timeout=app.config.get('INGEST_TIMEOUT', 10))
+    except FutureTimeoutError:
+        return QUEUED
+
+
+def validate_answers(questions, raw):
+    """Valide un dict de réponses contre la structure du sondage.
+
+    Retourne (réponses normalisées, None) ou (None, message d'erreur).
+    """
+    if not isinstance(raw, dict):
+        return None, 'answers doit être un objet'
+    answers = {}
+    for question in questions:
+        q_id = str(question['id'])
+        value = raw.get(q_id)
+        if question['type'] == 'choice':
+            if value not in question.get('choices', []):
+                return None, f'choix invalide pour la question {q_id}'
+        elif question['type'] == 'rating':
+            if isinstance(value, bool) or not isinstance(value, int) or value not in RATING_RANGE:
+                return None, f'note invalide pour la question {q_id}'
+        else:  # text
+            if not isinstance(value, str) or not value.strip():
+                return None, f'réponse manquante pour la question {q_id}'
+            value = value.strip()
+        answers[q_id] = value
+    return answers, None
+
+
+def _parse_item(definition, item):
+    """Retourne (user_id, réponses, date de soumission) ou lève ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError('élément invalide')
+    user_id = item.get('user_id')
+    if isinstance(user_id, bool) or not isinstance(user_id, int):
+        raise ValueError('user_id manquant')
+    answers, error = validate_answers(definition.questions, item.get('answers'))
+    if error:
+        raise ValueError(error)
+    submitted_at = item.get('submitted_at')
+    if submitted_at is not None:
+        submitted_at = datetime.fromisoformat(str(submitted_at))
+        if submitted_at.tzinfo is not None:
+            submitted_at = submitted_at.replace(tzinfo=None) - submitted_at.utcoffset()
+    # Collecte hors ligne : une réponse datée d'avant la clôture reste acceptée
+    if definition.is_expired() and (submitted_at is None or submitted_at > definition.end_date):
+        raise ValueError('sondage clos à cette date')
+    return user_id, answers, submitted_at
+
+
+def bulk_save_responses(definition, items, allowed_user_ids=None):
+    """Enregistre un lot de réponses pour un sondage, en quelques requêtes groupées.
+
+    Validation en une passe, doublons détectés par une requête ensembliste,
+    insertions en executemany et un seul commit. Retourne un statut par
+    élément, dans l'ordre reçu. Si `allowed_user_ids` est donné, seules les
+    réponses de ces comptes sont acceptées.
+    """
+    statuses = [None] * len(items)
+    parsed = {}
+    for index, item in enumerate(items):
+        try:
+            user_id, answers, submitted_at = _parse_item(definition, item)
+        except ValueError as e:
+            statuses[index] = {'status': INVALID, 'error': str(e)}
+            continue
+        if allowed_user_ids is not None and user_id not in allowed_user_ids:
+            statuses[index] = {'status': INVALID, 'error': 'utilisateur non autorisé'}
+            continue
+        if user_id in parsed:
+            statuses[index] = {'status': DUPLICATE}
+            continue
+        parsed[user_id] = (index, answers, submitted_at)
+
+    user_ids = list(parsed)
+    known_users = {row.id for row in db.session.query(User.id).filter(User.id.in_(user_ids))}
+    existing = {row.user_id for row in db.session.query(Response.user_id)
+                .filter(Response.survey_id == definition.id, Response.user_id.in_(user_ids))}
+    for user_id in user_ids:
+        index = parsed[user_id][0]
+        if user_id not in known_users:
+            statuses[index] = {'status': INVALID, 'error': 'utilisateur inconnu'}
+        elif user_id in existing:
+            statuses[index] = {'status': DUPLICATE}
+        else:
+            continue
+        del parsed[user_id]
+
+    if parsed:
+        now = datetime.utcnow()
+        try:
+            db.session.execute(insert(Response.__table__), [
+                {'survey_id': definition.id, 'user_id': user_id, 'answers': json.dumps(answers),
+                 'submitted_at': submitted_at or now}
+                for user_id, (index, answers, submitted_at) in parsed.items()])
+            # Identifiants attribués par la base, relus en une requête
+            response_ids = dict(db.session.query(Response.user_id, Response.id)
+                                .filter(Response.survey_id == definition.id,
+                                        Response.user_id.in_(list(parsed))))
+            rows, counts, texts = [], {}, {}
+            for user_id, (index, answers, submitted_at) in parsed.items():
+                rows.extend(dict(row, response_id=response_ids[user_id])
+                            for row in answer_rows(definition.id, answers))
+                counted, free_texts = split_answers(definition.id, answers)
+                merge_counts(counts, count_answers(counted))
+                collect_texts(texts, free_texts)
+            if rows:
+                db.session.execute(insert(ResponseAnswer.__table__), rows)
+            increment_tallies(definition.id, counts)
+            update_text_stats(definition.id, texts)
+            db.session.commit()
+        except IntegrityError:
+            # Soumission concurrente pour un même utilisateur : on rejoue un par un
+            db.session.rollback()
+            for user_id, (index, answers, submitted_at) in parsed.items():
+                statuses[index] = {'status': _commit_one(definition.id, user_id, answers, submitted_at)}
+        else:
+            broker.publish(definition.id, counts)
+            for index, _, _ in parsed.values():
+                statuses[index] = {'status': CREATED}
+    return statuses
@@ -0,0 +1,299 @@
+import json
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from analytics import analytics_key, key_digest, process_analytics, store_analytics
+from answers import ResponseAnswer
+from export import generate_export
+from models import db, Survey, Response
+from search import remove_survey
+from survey_cache import bump_version
+from tallies import clear_tallies, rebuild_results
+from textstats import clear_text_stats
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DELETE_CHUNK = 5000
+# Une tâche en cours signale qu'elle est vivante toutes les HEARTBEAT secondes ;
+# sans signal depuis LEASE secondes, son worker est considéré comme arrêté
+HEARTBEAT = 15
+LEASE = 90
+
+
+class Job(db.Model):
+    """Tâche de fond : suivi de l'état, de l'avancement et du fichier produit."""
+    __tablename__ = 'job'
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default=PENDING, index=True)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    result_path = db.Column(db.String(512))
+    error = db.Column(db.Text)
+    survey_id = db.Column(db.Integer, index=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'survey_id': self.survey_id,
+            'error': self.error,
+            'has_result': self.result_path is not None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Enregistre la fonction exécutant un type de tâche.
+
+    La fonction reçoit la tâche et ses paramètres, peut appeler
+    `set_progress` et retourne éventuellement le chemin du fichier produit.
+    """
+    def decorator(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=app.config.get('JOB_WORKERS', 2),
+                                           thread_name_prefix='job')
+        return _executor
+
+
+def job_dir(app, name):
+    path = os.path.join(app.instance_path, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def set_progress(job, progress):
+    job.progress = min(max(progress, 0.0), 1.0)
+    job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
+
+def requeue_if_stale(job):
+    """Relance une tâche en attente ou en cours dont le worker ne donne plus signe de vie.
+
+    Le processus qui l'exécutait (ou dont le pool la détenait) a pu s'arrêter
+    avant de la terminer. La remise en attente est conditionnelle : un seul
+    processus la relance, et `_run_job` ne l'exécute qu'une fois.
+    """
+    if job is None or job.status not in (PENDING, RUNNING):
+        return job
+    app = current_app._get_current_object()
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config.get('JOB_LEASE', LEASE))
+    if (job.heartbeat_at or job.created_at) >= cutoff:
+        return job
+    table = Job.__table__
+    requeued = db.session.execute(
+        table.update()
+        .where(table.c.id == job.id, table.c.status.in_([PENDING, RUNNING]),
+               func.coalesce(table.c.heartbeat_at, table.c.created_at) < cutoff)
+        .values(status=PENDING, heartbeat_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    if requeued:
+        app.logger.warning('Tâche %s (%s) interrompue : relancée', job.id, job.kind)
+        get_executor(app).submit(_run_job, app, job.id)
+    db.session.refresh(job)
+    return job
+
+
+def find_active_job(kind, survey_id, **params):
+    """Tâche du même type (et des mêmes paramètres, si donnés) déjà en attente
+    ou en cours pour ce sondage.
+
+    Une tâche interrompue par l'arrêt de son worker est relancée.
+    """
+    query = Job.query.filter(Job.kind == kind, Job.survey_id == survey_id,
+                             Job.status.in_([PENDING, RUNNING]))
+    if params:
+        query = query.filter(Job.params == json.dumps(params, sort_keys=True))
+    return requeue_if_stale(query.order_by(Job.created_at.desc()).first())
+
+
+def latest_job(kind, survey_id):
+    """Dernière tâche de ce type pour le sondage, quel que soit son état."""
+    return (Job.query.filter(Job.kind == kind, Job.survey_id == survey_id)
+            .order_by(Job.created_at.desc())
+            .first())
+
+
+def submit_job(kind, survey_id=None, created_by=None, **params):
+    """Crée la tâche en base puis la confie au pool de threads."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Type de tâche inconnu : {kind}')
+    job = Job(id=uuid.uuid4().hex, kind=kind, survey_id=survey_id, created_by=created_by,
+              params=json.dumps(params, sort_keys=True), heartbeat_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    app = current_app._get_current_object()
+    get_executor(app).submit(_run_job, app, job.id)
+    return job
+
+
+def _heartbeat(app, job_id, stop):
+    table = Job.__table__
+    with app.app_context():
+        while not stop.wait(HEARTBEAT):
+            try:
+                db.session.execute(table.update().where(table.c.id == job_id)
+                                   .values(heartbeat_at=datetime.utcnow()))
+                db.session.commit()
+            except Exception:
+                # Base occupée par la tâche elle-même : on réessaiera au prochain signal
+                db.session.rollback()
+        db.session.remove()
+
+
+def _run_job(app, job_id):
+    with app.app_context():
+        # Prise en charge atomique : une tâche relancée n'est exécutée qu'une fois
+        table = Job.__table__
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            table.update()
+            .where(table.c.id == job_id, table.c.status == PENDING)
+            .values(status=RUNNING, started_at=now, heartbeat_at=now)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            db.session.remove()
+            return
+
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(app, job_id, stop),
+                         name=f'job-heartbeat-{job_id[:8]}', daemon=True).start()
+        job = db.session.get(Job, job_id)
+        try:
+            job.result_path = JOB_HANDLERS[job.kind](job, **json.loads(job.params))
+            job.status = DONE
+            job.progress = 1.0
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.status = FAILED
+            job.error = str(e)
+            app.logger.error('Tâche %s (%s) en échec :\n%s', job_id, job.kind, traceback.format_exc())
+        finally:
+            stop.set()
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            db.session.remove()
+
+
+def purge_survey(survey_id, on_progress=None):
+    """Supprime un sondage et ses réponses par lots, avec un commit par lot."""
+    total = Response.query.filter_by(survey_id=survey_id).count() or 1
+    deleted = 0
+    while True:
+        ids = [row.id for row in (db.session.query(Response.id)
+                                  .filter(Response.survey_id == survey_id)
+                                  .limit(DELETE_CHUNK))]
+        if not ids:
+            break
+        ResponseAnswer.query.filter(ResponseAnswer.response_id.in_(ids)).delete(synchronize_session=False)
+        Response.query.filter(Response.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+        if on_progress is not None:
+            on_progress(deleted / total)
+
+    clear_tallies(survey_id)
+    clear_text_stats(survey_id)
+    remove_survey(survey_id)
+    survey = db.session.get(Survey, survey_id)
+    if survey is not None:
+        db.session.delete(survey)
+    db.session.commit()
+    bump_version(survey_id)
+
+
+@job_handler('delete_survey')
+def delete_survey_job(job):
+    purge_survey(job.survey_id, lambda progress: set_progress(job, progress))
+
+
+@job_handler('rebuild_results')
+def rebuild_results_job(job):
+    survey = db.session.get(Survey, job.survey_id)
+    # Sondage supprimé entre-temps : plus rien à recalculer
+    if survey is not None:
+        rebuild_results(survey)
+        db.session.commit()
+
+
+@job_handler('export')
+def export_job(job, fmt='csv', gzip=False):
+    survey = db.session.get(Survey, job.survey_id)
+    extension = fmt + ('.gz' if gzip else '')
+    path = os.path.join(job_dir(current_app, 'exports'), f'{job.id}.{extension}')
+    with open(path, 'wb') as f:
+        for chunk in generate_export(survey, fmt, compress=gzip):
+            f.write(chunk)
+    return path
+
+
+def analytics_path(app, key):
+    # Nommé d'après la clé de cache : tous les workers retrouvent le même fichier
+    return os.path.join(job_dir(app, 'analytics'), f'survey_{key[0]}_{key_digest(key)}.json')
+
+
+def load_analytics_result(key):
+    """Statistiques déjà calculées par une tâche de fond pour cette clé, ou None.
+
+    La tâche a pu tourner dans un autre worker : le résultat est relu depuis
+    son fichier puis gardé dans le cache du processus.
+    """
+    path = analytics_path(current_app, key)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        analytics = json.load(f)
+    store_analytics(key, analytics)
+    return analytics
+
+
+@job_handler('analytics')
+def analytics_job(job):
+    survey = db.session.get(Survey, job.survey_id)
+    key = analytics_key(survey)
+    # Le calcul remplit aussi le cache utilisé par la page d'analyse
+    analytics = process_analytics(survey, key)
+    path = analytics_path(current_app, key)
+    # Écriture puis renommage : un autre worker ne lit jamais un fichier partiel
+    with open(path + '.tmp', 'w') as f:
+        json.dump(analytics, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+    return path
@@ -0,0 +1,122 @@
+import json
+import queue
+import threading
+import time
+
+MAX_PENDING = 256
+HEARTBEAT = 15
+
+
+class Subscriber:
+    __slots__ = ('queue', 'overflowed')
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+
+class Broker:
+    """Diffusion en mémoire des incréments de résultats aux abonnés d'un sondage.
+
+    Un abonné trop lent n'est pas bloquant : quand sa file est pleine, les
+    incréments suivants sont ignorés et il est marqué `overflowed`, ce qui
+    lui fait renvoyer un instantané complet au lieu des deltas manqués.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, survey_id):
+        subscriber = Subscriber()
+        with self.lock:
+            self.subscribers.setdefault(survey_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, survey_id, subscriber):
+        with self.lock:
+            subscribers = self.subscribers.get(survey_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[survey_id]
+
+    def publish(self, survey_id, delta):
+        with self.lock:
+            subscribers = list(self.subscribers.get(survey_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(delta)
+            except queue.Full:
+                subscriber.overflowed = True
+
+    def subscriber_count(self, survey_id=None):
+        with self.lock:
+            if survey_id is not None:
+                return len(self.subscribers.get(survey_id, ()))
+            return sum(len(s) for s in self.subscribers.values())
+
+
+broker = Broker()
+
+
+def merge_counts(total, counts):
+    """Additionne des incréments {question: {option: n}} dans `total`."""
+    for question, options in counts.items():
+        question_total = total.setdefault(question, {})
+        for option, n in options.items():
+            question_total[option] = question_total.get(option, 0) + n
+    return total
+
+
+def sse_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+def stream_results(survey_id, snapshot, subscriber, load_snapshot, heartbeat=HEARTBEAT):
+    """Génère le flux SSE : un instantané, puis les incréments au fil des soumissions.
+
+    Les incréments ne sont diffusés que dans le processus qui a validé la
+    réponse : avec plusieurs workers, ceux des autres n'arrivent jamais ici.
+    Toutes les `heartbeat` secondes, les compteurs sont donc relus et un
+    nouvel instantané est envoyé s'ils diffèrent de l'état connu du client.
+    """
+    state = {question: dict(options) for question, options in snapshot.items()}
+
+    def resync():
+        # Les incréments encore en file sont couverts par le nouvel instantané
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        return load_snapshot()
+
+    try:
+        yield sse_event('snapshot', snapshot)
+        next_sync = time.monotonic() + heartbeat
+        while True:
+            try:
+                delta = subscriber.queue.get(timeout=max(next_sync - time.monotonic(), 0))
+            except queue.Empty:
+                delta = None
+            if subscriber.overflowed:
+                # Des incréments ont été perdus : on resynchronise
+                subscriber.overflowed = False
+                state = resync()
+                next_sync = time.monotonic() + heartbeat
+                yield sse_event('snapshot', state)
+                continue
+            if delta is not None:
+                merge_counts(state, delta)
+                yield sse_event('delta', delta)
+            if time.monotonic() < next_sync:
+                continue
+            next_sync = time.monotonic() + heartbeat
+            fresh = resync()
+            if fresh != state:
+                # Réponses reçues par un autre worker (ou incréments croisés)
+                state = fresh
+                yield sse_event('snapshot', state)
+            elif delta is None:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                yield ': keep-alive\n\n'
+    finally:
+        broker.unsubscribe(survey_id, subscriber)
@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Bornes des histogrammes de latence, en secondes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_QUERY_MS = 250
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Normalise une requête SQL : littéraux et listes IN remplacés par `?`."""
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = re.sub(r'%\(\w+\)s|:\w+', '?', statement)
+    statement = _IN_LIST.sub('IN (...)', statement)
+    return _SPACES.sub(' ', statement).strip()
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'buckets', 'duration', 'sql_count', 'sql_time', 'template_time')
+
+    def __init__(self):
+        self.requests = {}
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+
+class Metrics:
+    """Mesures par route : latence, requêtes SQL et temps de rendu des templates.
+
+    Les compteurs de la requête en cours sont gardés dans `g` et reportés
+    dans les statistiques globales une seule fois, à la fin de la requête.
+    """
+
+    def __init__(self, app=None):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+        self.collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._end_request)
+        before_render_template.connect(self._start_template, app)
+        template_rendered.connect(self._end_template, app)
+        event.listen(Engine, 'before_cursor_execute', self._start_query)
+        event.listen(Engine, 'after_cursor_execute', self._end_query)
+        app.extensions['metrics'] = self
+
+    def add_collector(self, collector):
+        """Ajoute une fonction retournant des lignes supplémentaires au format Prometheus."""
+        self.collectors.append(collector)
+
+    def _start_request(self):
+        g._metrics = {'start': time.perf_counter(), 'status': 500, 'sql_count': 0,
+                      'sql_time': 0.0, 'template_time': 0.0, 'template_depth': 0}
+
+    def _record_status(self, response):
+        if '_metrics' in g:
+            g._metrics['status'] = response.status_code
+        return response
+
+    def _end_request(self, exc=None):
+        current = g.pop('_metrics', None)
+        if current is None:
+            return
+        elapsed = time.perf_counter() - current['start']
+        endpoint = request.endpoint or 'unknown'
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.requests[current['status']] = stats.requests.get(current['status'], 0) + 1
+            stats.buckets[bisect_left(BUCKETS, elapsed)] += 1
+            stats.duration += elapsed
+            stats.sql_count += current['sql_count']
+            stats.sql_time += current['sql_time']
+            stats.template_time += current['template_time']
+
+    def _start_template(self, sender, template, context, **extra):
+        current = g.get('_metrics')
+        if current is not None:
+            # Seul le template le plus externe est chronométré (pas de double comptage)
+            if current['template_depth'] == 0:
+                current['template_start'] = time.perf_counter()
+            current['template_depth'] += 1
+
+    def _end_template(self, sender, template, context, **extra):
+        current = g.get('_metrics')
+        if current is not None and current['template_depth']:
+            current['template_depth'] -= 1
+            if current['template_depth'] == 0:
+                current['template_time'] += time.perf_counter() - current['template_start']
+
+    def _start_query(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _end_query(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context() and '_metrics' in g:
+            g._metrics['sql_count'] += 1
+            g._metrics['sql_time'] += elapsed
+        threshold = self.app.config.get('SLOW_QUERY_MS', SLOW_QUERY_MS)
+        if elapsed * 1000 >= threshold:
+            self.app.logger.warning('Requête lente (%.1f ms) : %s', elapsed * 1000, fingerprint(statement))
+
+    def render(self):
+        """Exporte les mesures au format texte Prometheus."""
+        with self.lock:
+            snapshot = {name: (dict(s.requests), list(s.buckets), s.duration,
+                               s.sql_count, s.sql_time, s.template_time)
+                        for name, s in self.endpoints.items()}
+
+        lines = ['# HELP http_requests_total Requêtes traitées par route et code HTTP.',
+                 '# TYPE http_requests_total counter']
+        for name, (requests, *_) in sorted(snapshot.items()):
+            for status, n in sorted(requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{name}",status="{status}"}} {n}')
+
+        lines += ['# HELP http_request_duration_seconds Latence des requêtes par route.',
+                  '# TYPE http_request_duration_seconds histogram']
+        for name, (requests, buckets, duration, *_) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ('+Inf',), buckets):
+                cumulative += n
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} '
+                             f'{cumulative}')
+            lines.append(f'http_request_duration_seconds_sum{{endpoint="{name}"}} {duration:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{endpoint="{name}"}} {cumulative}')
+
+        for metric, index, kind, help_text in (
+                ('sql_statements_total', 3, 'counter', 'Requêtes SQL exécutées par route.'),
+                ('sql_duration_seconds_total', 4, 'counter', 'Temps passé en SQL par route.'),
+                ('template_render_seconds_total', 5, 'counter', 'Temps de rendu Jinja par route.')):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+            for name, values in sorted(snapshot.items()):
+                value = values[index]
+                lines.append(f'{metric}{{endpoint="{name}"}} '
+                             f'{value if isinstance(value, int) else f"{value:.6f}"}')
+
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
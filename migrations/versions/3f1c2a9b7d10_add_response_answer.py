@@ -0,0 +1,80 @@
+"""add normalized response_answer table
+
+Revision ID: 3f1c2a9b7d10
+Revises:
+Create Date: 2026-10-18 10:12:41.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    bind = op.get_bind()
+    # La table peut déjà exister si `db.create_all()` a été lancé avant la migration
+    if not sa.inspect(bind).has_table('response_answer'):
+        op.create_table(
+            'response_answer',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('survey_id', sa.Integer(), nullable=False),
+            sa.Column('response_id', sa.Integer(), nullable=False),
+            sa.Column('question_id', sa.String(length=64), nullable=False),
+            sa.Column('choice', sa.Text(), nullable=True),
+            sa.Column('value', sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(['survey_id'], ['survey.id']),
+            sa.ForeignKeyConstraint(['response_id'], ['response.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_response_answer_response_id', 'response_answer', ['response_id'])
+        op.create_index('ix_response_answer_choice', 'response_answer',
+                        ['survey_id', 'question_id', 'choice'])
+        op.create_index('ix_response_answer_value', 'response_answer',
+                        ['survey_id', 'question_id', 'value'])
+
+    # Remplissage à partir du JSON existant, par lots triés sur la clé primaire
+    response = sa.table('response', sa.column('id'), sa.column('survey_id'), sa.column('answers'))
+    answer = sa.table('response_answer', sa.column('survey_id'), sa.column('response_id'),
+                      sa.column('question_id'), sa.column('choice'), sa.column('value'))
+    bind.execute(answer.delete())
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(response.c.id, response.c.survey_id, response.c.answers)
+            .where(response.c.id > last_id)
+            .order_by(response.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+        rows = []
+        for response_id, survey_id, raw in batch:
+            for question_id, value in json.loads(raw or '{}').items():
+                for option in (value if isinstance(value, list) else [value]):
+                    rows.append({
+                        'survey_id': survey_id,
+                        'response_id': response_id,
+                        'question_id': str(question_id),
+                        'choice': None if option is None else str(option),
+                        'value': float(option) if isinstance(option, (int, float)) else None,
+                    })
+        if rows:
+            bind.execute(answer.insert(), rows)
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    op.drop_index('ix_response_answer_value', table_name='response_answer')
+    op.drop_index('ix_response_answer_choice', table_name='response_answer')
+    op.drop_index('ix_response_answer_response_id', table_name='response_answer')
+    op.drop_table('response_answer')
@@ -0,0 +1,40 @@
+"""add survey_tally pre-aggregated counters
+
+Revision ID: 5d0b7e3a9c21
+Revises: c72b09e4f5a8
+Create Date: 2026-10-19 09:20:14.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0b7e3a9c21'
+down_revision = 'c72b09e4f5a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La table peut déjà exister si `db.create_all()` a été lancé avant la migration
+    if sa.inspect(op.get_bind()).has_table('survey_tally'):
+        return
+    op.create_table(
+        'survey_tally',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('survey_id', sa.Integer(), nullable=False),
+        sa.Column('question_id', sa.String(length=64), nullable=False),
+        sa.Column('option', sa.Text(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['survey_id'], ['survey.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('survey_id', 'question_id', 'option', name='uq_survey_tally'),
+    )
+    op.create_index('ix_survey_tally_survey_id', 'survey_tally', ['survey_id'])
+    # Les compteurs sont remplis ensuite par `flask rebuild-tallies`
+
+
+def downgrade():
+    op.drop_index('ix_survey_tally_survey_id', table_name='survey_tally')
+    op.drop_table('survey_tally')
@@ -0,0 +1,58 @@
+"""add survey_fts full-text index
+
+Revision ID: 8a4e6d2c51b3
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 14:03:27.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6d2c51b3'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+def load_questions(raw):
+    """Décode `survey.questions` lu en SQL brut.
+
+    La colonne est de type JSON et l'application y range une chaîne déjà
+    encodée (`json.dumps`) : comme `Survey.get_questions`, on décode une
+    seconde fois si le premier décodage donne une chaîne.
+    """
+    questions = json.loads(raw or '[]')
+    if isinstance(questions, str):
+        questions = json.loads(questions)
+    return questions
+
+
+def upgrade():
+    bind = op.get_bind()
+    # FTS5 n'existe que sous SQLite ; les autres bases utilisent la recherche LIKE
+    if bind.dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS survey_fts "
+        "USING fts5(title, description, questions, tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute("DELETE FROM survey_fts")
+    surveys = bind.execute(sa.text("SELECT id, title, description, questions FROM survey"))
+    rows = []
+    for survey_id, title, description, questions in surveys:
+        texts = ' '.join(q.get('text', '') for q in load_questions(questions))
+        rows.append({'rowid': survey_id, 'title': title or '',
+                     'description': description or '', 'questions': texts})
+    if rows:
+        bind.execute(sa.text(
+            "INSERT INTO survey_fts (rowid, title, description, questions) "
+            "VALUES (:rowid, :title, :description, :questions)"), rows)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS survey_fts")
@@ -0,0 +1,48 @@
+"""add job table for background tasks
+
+Revision ID: 9b3f5c1d7e42
+Revises: 5d0b7e3a9c21
+Create Date: 2026-10-19 10:05:37.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3f5c1d7e42'
+down_revision = '5d0b7e3a9c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La table peut déjà exister si `db.create_all()` a été lancé avant la migration
+    if sa.inspect(op.get_bind()).has_table('job'):
+        return
+    op.create_table(
+        'job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('progress', sa.Float(), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('result_path', sa.String(length=512), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('survey_id', sa.Integer(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_job_status', 'job', ['status'])
+    op.create_index('ix_job_survey_id', 'job', ['survey_id'])
+
+
+def downgrade():
+    op.drop_index('ix_job_survey_id', table_name='job')
+    op.drop_index('ix_job_status', table_name='job')
+    op.drop_table('job')
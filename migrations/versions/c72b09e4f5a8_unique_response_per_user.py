@@ -0,0 +1,37 @@
+"""unique response per survey and user
+
+Revision ID: c72b09e4f5a8
+Revises: 8a4e6d2c51b3
+Create Date: 2026-10-18 16:41:05.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c72b09e4f5a8'
+down_revision = '8a4e6d2c51b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Supprimer les doublons éventuels en gardant la première réponse
+    duplicates = (
+        "SELECT id FROM response WHERE id NOT IN "
+        "(SELECT MIN(id) FROM response GROUP BY survey_id, user_id)"
+    )
+    op.execute(f"DELETE FROM response_answer WHERE response_id IN ({duplicates})")
+    op.execute(f"DELETE FROM response WHERE id IN ({duplicates})")
+    # Les compteurs (survey_tally, text_stat) comptent encore les doublons
+    # supprimés : `flask rebuild-tallies` doit être lancé après la migration.
+
+    # L'index peut déjà exister si `db.create_all()` a été lancé avant la migration
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('response')}
+    if 'uq_response_survey_user' not in indexes:
+        op.create_index('uq_response_survey_user', 'response', ['survey_id', 'user_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_response_survey_user', table_name='response')
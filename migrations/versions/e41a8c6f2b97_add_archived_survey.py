@@ -0,0 +1,46 @@
+"""add archived_survey table
+
+Revision ID: e41a8c6f2b97
+Revises: 9b3f5c1d7e42
+Create Date: 2026-10-19 11:32:50.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41a8c6f2b97'
+down_revision = '9b3f5c1d7e42'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # La table peut déjà exister si `db.create_all()` a été lancé avant la migration
+    if sa.inspect(op.get_bind()).has_table('archived_survey'):
+        return
+    op.create_table(
+        'archived_survey',
+        sa.Column('archive_id', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('questions', sa.Text(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('end_date', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.Column('response_count', sa.Integer(), nullable=False),
+        sa.Column('results', sa.Text(), nullable=False),
+        sa.Column('path', sa.String(length=512), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('archive_id'),
+    )
+    op.create_index('ix_archived_survey_author_id', 'archived_survey', ['author_id'])
+    op.create_index('ix_archived_survey_survey', 'archived_survey', ['id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_archived_survey_survey', table_name='archived_survey')
+    op.drop_index('ix_archived_survey_author_id', table_name='archived_survey')
+    op.drop_table('archived_survey')
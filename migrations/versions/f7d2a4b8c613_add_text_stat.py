@@ -0,0 +1,41 @@
+"""add text_stat free-text statistics
+
+Revision ID: f7d2a4b8c613
+Revises: e41a8c6f2b97
+Create Date: 2026-10-19 11:58:06.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7d2a4b8c613'
+down_revision = 'e41a8c6f2b97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La table peut déjà exister si `db.create_all()` a été lancé avant la migration
+    if sa.inspect(op.get_bind()).has_table('text_stat'):
+        return
+    op.create_table(
+        'text_stat',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('survey_id', sa.Integer(), nullable=False),
+        sa.Column('question_id', sa.String(length=64), nullable=False),
+        sa.Column('answer_count', sa.Integer(), nullable=False),
+        sa.Column('total_length', sa.Integer(), nullable=False),
+        sa.Column('length_histogram', sa.Text(), nullable=False),
+        sa.Column('sketch', sa.LargeBinary(), nullable=True),
+        sa.Column('top_terms', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['survey_id'], ['survey.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('survey_id', 'question_id', name='uq_text_stat'),
+    )
+    # Les statistiques sont remplies ensuite par `flask rebuild-tallies`
+
+
+def downgrade():
+    op.drop_table('text_stat')
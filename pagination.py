@@ -0,0 +1,60 @@
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def page_size(value):
+    """Borne la taille de page demandée par le client."""
+    if not value or value < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(value, MAX_PAGE_SIZE)
+
+
+def encode_cursor(created_at, item_id):
+    if created_at is None:
+        return str(item_id)
+    return f'{created_at.isoformat()}_{item_id}'
+
+
+def decode_cursor(cursor):
+    """Retourne (created_at, id) ; (None, None) si le curseur est invalide."""
+    try:
+        if '_' not in cursor:
+            return None, int(cursor)
+        created_at, item_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (TypeError, ValueError):
+        return None, None
+
+
+def keyset_page(query, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE, created_column=None):
+    """Pagination par clé (du plus récent au plus ancien) sans OFFSET.
+
+    Trie sur (created_column, id_column) décroissants, ou seulement sur
+    id_column si created_column est absent. Une ligne de plus est lue pour
+    savoir s'il existe une page suivante.
+    """
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        if created_column is not None and created_at is not None:
+            query = query.filter(or_(created_column < created_at,
+                                     and_(created_column == created_at, id_column < item_id)))
+        elif item_id is not None:
+            query = query.filter(id_column < item_id)
+
+    order = [id_column.desc()] if created_column is None else [created_column.desc(), id_column.desc()]
+    items = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        created_at = getattr(last, created_column.key) if created_column is not None else None
+        next_cursor = encode_cursor(created_at, getattr(last, id_column.key))
+    return Page(items, next_cursor)
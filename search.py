@@ -0,0 +1,97 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import DDL, column, event, func, literal_column, or_, table, text
+
+from models import db, User, Survey
+
+FTS_TABLE = 'survey_fts'
+# Poids BM25 des colonnes : titre > description > questions
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+CREATE_INDEX = DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(title, description, questions, tokenize='unicode61 remove_diacritics 2')"
+)
+
+# L'index est créé avec les autres tables par `db.create_all()` (SQLite uniquement)
+event.listen(db.metadata, 'after_create', CREATE_INDEX.execute_if(dialect='sqlite'))
+
+survey_fts = table(FTS_TABLE, column('rowid'), column('title'),
+                   column('description'), column('questions'))
+
+
+def fts_enabled():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def _document(survey):
+    questions = ' '.join(q.get('text', '') for q in survey.get_questions())
+    return {'rowid': survey.id, 'title': survey.title or '',
+            'description': survey.description or '', 'questions': questions}
+
+
+def index_survey(survey):
+    """Ajoute ou remplace un sondage dans l'index (sans commit)."""
+    if not fts_enabled():
+        return
+    remove_survey(survey.id)
+    db.session.execute(survey_fts.insert().values(**_document(survey)))
+
+
+def remove_survey(survey_id):
+    if not fts_enabled():
+        return
+    db.session.execute(survey_fts.delete().where(survey_fts.c.rowid == survey_id))
+
+
+def rebuild_index(batch_size=500):
+    db.session.execute(CREATE_INDEX)
+    db.session.execute(survey_fts.delete())
+    batch = []
+    for survey in Survey.query.yield_per(batch_size):
+        batch.append(_document(survey))
+        if len(batch) == batch_size:
+            db.session.execute(survey_fts.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(survey_fts.insert(), batch)
+
+
+def match_expression(keyword):
+    """Convertit la saisie utilisateur en requête FTS5 sûre (recherche par préfixe)."""
+    terms = re.findall(r'\w+', keyword or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search(keyword='', status=None, author=None, date_from=None, date_to=None,
+           page=1, per_page=20):
+    """Recherche paginée ; retourne (sondages, page_suivante_existe).
+
+    Les filtres sont appliqués dans la même requête que la recherche plein texte.
+    """
+    query = Survey.query
+    match = match_expression(keyword)
+    if match and fts_enabled():
+        query = (query.join(survey_fts, survey_fts.c.rowid == Survey.id)
+                 .filter(text(f'{FTS_TABLE} MATCH :match').bindparams(match=match))
+                 .order_by(func.bm25(literal_column(FTS_TABLE), *BM25_WEIGHTS)))
+    elif match:
+        query = query.filter(or_(Survey.title.contains(keyword),
+                                 Survey.description.contains(keyword)))
+
+    now = datetime.utcnow()
+    if status == 'active':
+        query = query.filter(Survey.is_active == True, Survey.end_date > now)
+    elif status == 'expired':
+        query = query.filter(Survey.end_date <= now)
+    if author:
+        query = query.join(User, User.id == Survey.author_id).filter(User.username == author)
+    if date_from:
+        query = query.filter(Survey.created_at >= date_from)
+    if date_to:
+        query = query.filter(Survey.created_at <= date_to)
+
+    query = query.order_by(Survey.created_at.desc(), Survey.id.desc())
+    surveys = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return surveys[:per_page], len(surveys) > per_page
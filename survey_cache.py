@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from models import db, Survey
+
+MAX_SIZE = 1024
+# Borne la durée de vie d'une entrée : les versions sont propres à chaque
+# processus, une modification faite par un autre worker est vue après ce délai.
+TTL = 30
+
+
+class SurveyDefinition(namedtuple('SurveyDefinition',
+                                  ['id', 'author_id', 'title', 'questions', 'end_date', 'is_active'])):
+    """Structure d'un sondage, déjà décodée, sans lien avec la session SQLAlchemy."""
+    __slots__ = ()
+
+    def get_questions(self):
+        return self.questions
+
+    def is_expired(self):
+        return self.end_date is not None and self.end_date <= datetime.utcnow()
+
+
+class SurveyCache:
+    """Cache LRU des définitions de sondage, borné à `max_size` entrées.
+
+    `bump_version` retire l'entrée du sondage et incrémente un compteur de
+    version global : une lecture commencée avant l'invalidation ne stocke
+    pas son résultat, devenu peut-être obsolète. Aucun état n'est conservé
+    par sondage en dehors des entrées elles-mêmes.
+    """
+
+    def __init__(self, max_size=MAX_SIZE, ttl=TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.version = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, survey_id):
+        """Retourne la définition du sondage, ou None s'il n'existe pas."""
+        with self.lock:
+            entry = self.entries.get(survey_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.entries.move_to_end(survey_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self.version
+
+        survey = db.session.get(Survey, survey_id)
+        if survey is None:
+            return None
+        definition = SurveyDefinition(survey.id, survey.author_id, survey.title,
+                                      survey.get_questions(), survey.end_date, survey.is_active)
+        with self.lock:
+            # Ne pas stocker un résultat devenu obsolète pendant la lecture
+            if version == self.version:
+                self.entries[survey_id] = (time.monotonic(), definition)
+                self.entries.move_to_end(survey_id)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return definition
+
+    def bump_version(self, survey_id):
+        """Invalide la définition mise en cache après une modification du sondage."""
+        with self.lock:
+            self.version += 1
+            self.entries.pop(survey_id, None)
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self.entries), 'max_size': self.max_size}
+
+
+survey_cache = SurveyCache()
+
+
+def get_definition(survey_id):
+    return survey_cache.get(survey_id)
+
+
+def bump_version(survey_id):
+    survey_cache.bump_version(survey_id)
@@ -0,0 +1,91 @@
+from sqlalchemy import func, select
+
+from answers import ResponseAnswer
+from models import db
+from textstats import rebuild_text_stats
+
+
+class SurveyTally(db.Model):
+    """Compteur pré-agrégé : nombre de réponses par sondage / question / option."""
+    __tablename__ = 'survey_tally'
+    __table_args__ = (
+        db.UniqueConstraint('survey_id', 'question_id', 'option', name='uq_survey_tally'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    survey_id = db.Column(db.Integer, db.ForeignKey('survey.id'), nullable=False, index=True)
+    question_id = db.Column(db.String(64), nullable=False)
+    option = db.Column(db.Text, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+def count_answers(answers):
+    """Transforme un dict de réponses en {question: {option: n}}."""
+    counts = {}
+    for question, answer in answers.items():
+        # Une réponse peut être une liste (choix multiples) ou une valeur simple
+        options = answer if isinstance(answer, list) else [answer]
+        for option in options:
+            if option is None:
+                continue
+            question_counts = counts.setdefault(str(question), {})
+            question_counts[str(option)] = question_counts.get(str(option), 0) + 1
+    return counts
+
+
+def increment_tallies(survey_id, counts):
+    """Ajoute `counts` aux compteurs du sondage dans la session courante.
+
+    Ne fait pas de commit : l'appelant valide dans la même transaction que
+    l'insertion de la réponse. L'UPDATE prend le verrou d'écriture avant
+    l'éventuel INSERT, ce qui sérialise les soumissions concurrentes.
+    """
+    table = SurveyTally.__table__
+    for question_id, options in counts.items():
+        for option, n in options.items():
+            updated = db.session.execute(
+                table.update()
+                .where(table.c.survey_id == survey_id,
+                       table.c.question_id == question_id,
+                       table.c.option == option)
+                .values(count=table.c.count + n)
+            ).rowcount
+            if not updated:
+                db.session.execute(table.insert().values(
+                    survey_id=survey_id, question_id=question_id, option=option, count=n))
+
+
+def clear_tallies(survey_id):
+    SurveyTally.query.filter_by(survey_id=survey_id).delete(synchronize_session=False)
+
+
+def rebuild_tallies(survey_id, text_question_ids=()):
+    """Recalcule les compteurs d'un sondage par un GROUP BY sur les réponses normalisées.
+
+    Les questions libres (`text_question_ids`) ne sont pas comptées par option.
+    """
+    clear_tallies(survey_id)
+    answer = ResponseAnswer.__table__
+    counts = (select(answer.c.survey_id, answer.c.question_id, answer.c.choice, func.count())
+              .where(answer.c.survey_id == survey_id, answer.c.choice.isnot(None),
+                     answer.c.question_id.notin_(list(text_question_ids)))
+              .group_by(answer.c.survey_id, answer.c.question_id, answer.c.choice))
+    db.session.execute(SurveyTally.__table__.insert().from_select(
+        ['survey_id', 'question_id', 'option', 'count'], counts))
+
+
+def rebuild_results(survey):
+    """Recalcule compteurs et index de termes d'un sondage à partir des réponses stockées."""
+    text_ids = {str(q['id']) for q in survey.get_questions() if q['type'] == 'text'}
+    rebuild_tallies(survey.id, text_ids)
+    rebuild_text_stats(survey.id, text_ids)
+
+
+def get_results(survey_id):
+    """Retourne les résultats agrégés sous la forme {question: {option: n}}."""
+    results = {}
+    rows = (db.session.query(SurveyTally.question_id, SurveyTally.option, SurveyTally.count)
+            .filter(SurveyTally.survey_id == survey_id))
+    for question_id, option, count in rows:
+        results.setdefault(question_id, {})[option] = count
+    return results
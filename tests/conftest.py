@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_migrate import Migrate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models import db, User, Survey  # noqa: E402
+from ingest import configure_sqlite  # noqa: E402
+from survey_cache import survey_cache  # noqa: E402
+import analytics  # noqa: E402
+import archive  # noqa: E402,F401 - enregistre les modèles des tables ajoutées
+import jobs  # noqa: E402,F401
+
+MIGRATIONS_DIR = os.path.join(ROOT, 'migrations')
+
+QUESTIONS = [
+    {'id': '1', 'text': 'Satisfaction', 'type': 'choice', 'choices': ['Oui', 'Non']},
+    {'id': '2', 'text': 'Note', 'type': 'rating'},
+    {'id': '3', 'text': 'Commentaire', 'type': 'text'},
+]
+
+
+def make_app(tmp_path, **config):
+    app = Flask(__name__, instance_path=str(tmp_path / 'instance'))
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test',
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "test.db"}',
+        ARCHIVE_DIR=str(tmp_path / 'archive'),
+        **config,
+    )
+    db.init_app(app)
+    Migrate(app, db, directory=MIGRATIONS_DIR)
+    with app.app_context():
+        configure_sqlite(db.engine)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Chaque test repart d'une base vide : les identifiants sont réutilisés
+    survey_cache.entries.clear()
+    analytics._cache.clear()
+    yield
+    survey_cache.entries.clear()
+    analytics._cache.clear()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def create_user(name, role='user'):
+    user = User(username=name, email=f'{name}@test.local', role=role)
+    user.password = 'secret'
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def create_survey(author, title='Sondage', end_date=None, created_at=None):
+    survey = Survey(title=title, description='Description', questions=json.dumps(QUESTIONS),
+                    end_date=end_date or datetime.utcnow() + timedelta(days=7),
+                    author_id=author.id, is_active=True)
+    if created_at is not None:
+        survey.created_at = created_at
+    db.session.add(survey)
+    db.session.commit()
+    return survey
+
+
+def answers(choice='Oui', rating=4, comment='Service rapide et accueil agréable'):
+    return {'1': choice, '2': rating, '3': comment}
@@ -0,0 +1,76 @@
+import analytics
+from analytics import analytics_key, cached_analytics, compute_analytics, process_analytics
+from conftest import answers, create_survey, create_user
+from ingest import save_response
+from jobs import Job, analytics_job, load_analytics_result
+from models import db
+
+
+def test_compute_analytics(app):
+    author = create_user('author')
+    survey = create_survey(author)
+    for i, (choice, rating) in enumerate([('Oui', 5), ('Oui', 3), ('Non', 1), ('Oui', 3)]):
+        save_response(survey.id, create_user(f'user{i}').id,
+                      answers(choice=choice, rating=rating, comment='x' * (i + 1)))
+
+    analytics = compute_analytics(survey)
+
+    assert analytics['response_count'] == 4
+    assert analytics['questions']['1']['histogram'] == {'Oui': 3, 'Non': 1}
+    ratings = analytics['questions']['2']
+    assert ratings['count'] == 4
+    assert ratings['mean'] == 3.0
+    assert ratings['median'] == 3.0
+    assert ratings['histogram'] == {1: 1, 3: 2, 5: 1}
+    assert analytics['questions']['3'] == {'count': 4, 'mean_length': 2.5, 'type': 'text',
+                                           'text': 'Commentaire'}
+    assert sum(n for _, n in analytics['timeline']) == 4
+
+
+def test_process_analytics_is_cached_until_a_new_response(app):
+    author = create_user('author')
+    survey = create_survey(author)
+    save_response(survey.id, create_user('alice').id, answers())
+
+    first = process_analytics(survey)
+    assert process_analytics(survey) is first
+
+    save_response(survey.id, create_user('bob').id, answers(choice='Non'))
+    second = process_analytics(survey)
+    assert second is not first
+    assert second['questions']['1']['histogram'] == {'Oui': 1, 'Non': 1}
+
+
+def test_analytics_for_several_surveys_in_one_process(app):
+    author = create_user('author')
+    surveys = [create_survey(author, title=f'Sondage {i}') for i in range(2)]
+    for i, survey in enumerate(surveys):
+        save_response(survey.id, create_user(f'user{i}').id, answers(choice=('Oui', 'Non')[i]))
+
+    results = [process_analytics(survey) for survey in surveys]
+
+    assert results[0]['questions']['1']['histogram'] == {'Oui': 1, 'Non': 0}
+    assert results[1]['questions']['1']['histogram'] == {'Oui': 0, 'Non': 1}
+    assert [cached_analytics(survey)[1] for survey in surveys] == results
+
+
+def test_finished_job_result_is_reused_by_another_worker(app):
+    author = create_user('author')
+    survey = create_survey(author)
+    save_response(survey.id, create_user('alice').id, answers())
+    key = analytics_key(survey)
+    job = Job(id='a' * 32, kind='analytics', survey_id=survey.id)
+    db.session.add(job)
+    db.session.commit()
+
+    path = analytics_job(job)
+    # Autre processus : cache local vide, résultat relu depuis le fichier de la tâche
+    analytics._cache.clear()
+    assert cached_analytics(survey) == (key, None)
+    loaded = load_analytics_result(key)
+    assert loaded['questions']['1']['histogram'] == {'Oui': 1, 'Non': 0}
+    assert cached_analytics(survey) == (key, loaded)
+
+    save_response(survey.id, create_user('bob').id, answers())
+    assert load_analytics_result(analytics_key(survey)) is None
+    assert path.endswith('.json')
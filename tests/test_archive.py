@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from archive import ArchivedSurvey, archive_rows, archive_survey, latest_archive
+from conftest import answers, create_survey, create_user
+from ingest import save_response
+from models import db, Survey, Response
+from tallies import get_results
+
+ENDED = datetime.utcnow() - timedelta(days=365)
+
+
+def test_archive_round_trip(app):
+    author = create_user('author')
+    users = [create_user(f'user{i}') for i in range(3)]
+    survey = create_survey(author, title='Ancien sondage', end_date=ENDED)
+    submitted = {}
+    for i, user in enumerate(users):
+        submitted[user.id] = answers(choice='Oui' if i else 'Non', rating=i + 1, comment=f'Avis {i}')
+        save_response(survey.id, user.id, submitted[user.id])
+    survey_id, tallies = survey.id, get_results(survey.id)
+
+    archive_survey(survey)
+
+    assert db.session.get(Survey, survey_id) is None
+    assert Response.query.filter_by(survey_id=survey_id).count() == 0
+    assert get_results(survey_id) == {}
+
+    archived = latest_archive(survey_id)
+    assert archived.title == 'Ancien sondage'
+    assert archived.response_count == 3
+    assert archived.get_results()['tallies'] == tallies
+    rows = list(archive_rows(archived))
+    assert {user_id: values for _, user_id, _, values in rows} == submitted
+    assert all(isinstance(submitted_at, datetime) for _, _, submitted_at, _ in rows)
+
+
+def test_reused_survey_id_gets_its_own_archive(app):
+    author, user = create_user('author'), create_user('alice')
+    first = create_survey(author, title='Premier', end_date=ENDED,
+                          created_at=datetime.utcnow() - timedelta(days=400))
+    save_response(first.id, user.id, answers(choice='Non'))
+    survey_id = first.id
+    archive_survey(first)
+
+    # SQLite réattribue l'identifiant du sondage supprimé
+    second = create_survey(author, title='Second', end_date=ENDED)
+    assert second.id == survey_id
+    save_response(second.id, user.id, answers(choice='Oui'))
+    archive_survey(second)
+
+    archives = ArchivedSurvey.query.filter_by(id=survey_id).order_by(ArchivedSurvey.archive_id).all()
+    assert [a.title for a in archives] == ['Premier', 'Second']
+    assert archives[0].path != archives[1].path
+    assert [values['1'] for _, _, _, values in archive_rows(archives[1])] == ['Oui']
+    assert [values['1'] for _, _, _, values in archive_rows(archives[0])] == ['Non']
+    assert latest_archive(survey_id).title == 'Second'
+    assert latest_archive(survey_id).get_results()['tallies']['1'] == {'Oui': 1}
@@ -0,0 +1,38 @@
+from flask import Flask
+
+from assets import Assets, build
+
+
+def make_assets_app(tmp_path):
+    lib = tmp_path / 'templates' / 'lib' / 'waypoints'
+    lib.mkdir(parents=True)
+    (lib / 'waypoints.js').write_text('window.Waypoint = {};' * 50)
+    (lib / 'links.php').write_text('<?php echo "secret"; ?>')
+    app = Flask(__name__, root_path=str(tmp_path))
+    Assets(app)
+    return app
+
+
+def test_unbuilt_sources_are_limited_to_asset_types(tmp_path):
+    client = make_assets_app(tmp_path).test_client()
+
+    response = client.get('/assets/theme/lib/waypoints/waypoints.js')
+    assert response.status_code == 200
+    assert response.data == b'window.Waypoint = {};' * 50
+    assert client.get('/assets/theme/lib/waypoints/links.php').status_code == 404
+    assert client.get('/assets/theme/lib/../lib/waypoints/waypoints.js').status_code == 404
+
+
+def test_fingerprinted_asset_is_immutable_and_compressed(tmp_path):
+    make_assets_app(tmp_path)
+    manifest = build(str(tmp_path))
+    assert 'theme/lib/waypoints/links.php' not in manifest
+    # Nouvelle application : le manifeste est lu au démarrage
+    app = Flask(__name__, root_path=str(tmp_path))
+    Assets(app)
+    url = manifest['theme/lib/waypoints/waypoints.js']
+
+    response = app.test_client().get(f'/assets/{url}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.headers['Content-Encoding'] == 'gzip'
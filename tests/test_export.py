@@ -0,0 +1,54 @@
+import csv
+import gzip
+import io
+import json
+
+from conftest import answers, create_survey, create_user
+from export import generate_export
+from ingest import save_response
+
+
+def submit(survey, count):
+    users = [create_user(f'user{i}') for i in range(count)]
+    for i, user in enumerate(users):
+        save_response(survey.id, user.id, answers(choice=('Oui', 'Non')[i % 2], rating=i % 5 + 1,
+                                                  comment=f'Réponse "{i}", avec virgule'))
+    return users
+
+
+def test_csv_export_streams_header_then_batches(app):
+    survey = create_survey(create_user('author'))
+    users = submit(survey, 5)
+
+    chunks = list(generate_export(survey, 'csv', batch_size=2))
+
+    # En-tête seul, puis un bloc par lot de deux lignes, puis le reste
+    assert len(chunks) == 1 + 2 + 1
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+    assert rows[0] == ['response_id', 'user_id', 'submitted_at', 'Satisfaction', 'Note', 'Commentaire']
+    assert [int(row[1]) for row in rows[1:]] == [user.id for user in users]
+    assert rows[1][3:] == ['Oui', '1', 'Réponse "0", avec virgule']
+
+
+def test_ndjson_export_round_trips_answers(app):
+    survey = create_survey(create_user('author'))
+    submit(survey, 3)
+
+    lines = b''.join(generate_export(survey, 'ndjson', batch_size=2)).decode('utf-8').splitlines()
+
+    records = [json.loads(line) for line in lines]
+    assert [r['answers'] for r in records] == [
+        answers(choice='Oui', rating=1, comment='Réponse "0", avec virgule'),
+        answers(choice='Non', rating=2, comment='Réponse "1", avec virgule'),
+        answers(choice='Oui', rating=3, comment='Réponse "2", avec virgule'),
+    ]
+
+
+def test_gzip_export_matches_plain_export(app):
+    survey = create_survey(create_user('author'))
+    submit(survey, 4)
+
+    plain = b''.join(generate_export(survey, 'csv'))
+    compressed = b''.join(generate_export(survey, 'csv', compress=True))
+
+    assert gzip.decompress(compressed) == plain
@@ -0,0 +1,55 @@
+import json
+from datetime import datetime, timedelta
+
+from flask import flash
+
+from conftest import answers, create_survey, create_user
+from httpcache import conditional_response, not_modified, survey_etag
+from ingest import bulk_save_responses, save_response
+from models import db
+from survey_cache import get_definition
+
+
+def test_etag_changes_on_edit_and_back_dated_response(app):
+    author = create_user('author')
+    survey = create_survey(author)
+    save_response(survey.id, create_user('alice').id, answers())
+
+    with app.test_request_context('/'):
+        first = survey_etag(survey, 'view')
+
+        survey.questions = json.dumps(json.loads(survey.questions)[:2])
+        db.session.commit()
+        edited = survey_etag(survey, 'view')
+        assert edited != first
+
+        # Synchronisation hors ligne : réponse datée d'avant la précédente
+        back_dated = (datetime.utcnow() - timedelta(days=3)).isoformat()
+        bulk_save_responses(get_definition(survey.id), [
+            {'user_id': create_user('bob').id, 'answers': answers(), 'submitted_at': back_dated},
+        ])
+        assert survey_etag(survey, 'view') not in (first, edited)
+
+
+def test_conditional_get(app):
+    survey = create_survey(create_user('author'))
+
+    with app.test_request_context('/'):
+        etag = survey_etag(survey, 'view')
+
+    with app.test_request_context('/', headers={'If-None-Match': f'"{etag}"'}):
+        assert not_modified(etag)
+        response = conditional_response(app, 304, etag)
+        assert response.status_code == 304
+        assert response.get_etag() == (etag, False)
+        assert 'Last-Modified' not in response.headers
+
+    with app.test_request_context('/', headers={'If-None-Match': '"autre"'}):
+        assert not not_modified(etag)
+
+
+def test_pending_flash_disables_not_modified(app):
+    with app.test_request_context('/', headers={'If-None-Match': '"abc"'}):
+        assert not_modified('abc')
+        flash('Enregistré')
+        assert not not_modified('abc')
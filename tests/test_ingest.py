@@ -0,0 +1,89 @@
+import threading
+
+from conftest import answers, create_survey, create_user, make_app
+from ingest import CREATED, DUPLICATE, INVALID, bulk_save_responses, save_response
+from models import db, User, Response
+from survey_cache import get_definition
+from tallies import get_results
+
+
+def test_second_response_from_same_user_is_duplicate(app):
+    author, user = create_user('author'), create_user('alice')
+    survey = create_survey(author)
+
+    assert save_response(survey.id, user.id, answers()) == CREATED
+    assert save_response(survey.id, user.id, answers(choice='Non')) == DUPLICATE
+    assert Response.query.filter_by(survey_id=survey.id).count() == 1
+    assert get_results(survey.id)['1'] == {'Oui': 1}
+
+
+def test_group_commit_with_more_requests_than_pooled_connections(tmp_path):
+    app = make_app(tmp_path, INGEST_GROUP_COMMIT=True, INGEST_TIMEOUT=30,
+                   SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 2, 'max_overflow': 0, 'pool_timeout': 5})
+    with app.app_context():
+        db.create_all()
+        author = create_user('author')
+        survey_id = create_survey(author).id
+        user_ids = [create_user(f'user{i}').id for i in range(20)]
+
+    statuses, errors = [], []
+
+    def submit(user_id):
+        with app.app_context():
+            try:
+                # Comme une requête : la session a déjà une connexion (utilisateur, sondage)
+                db.session.get(User, user_id)
+                get_definition(survey_id)
+                statuses.append(save_response(survey_id, user_id, answers()))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=submit, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert statuses == [CREATED] * len(user_ids)
+    with app.app_context():
+        assert Response.query.filter_by(survey_id=survey_id).count() == len(user_ids)
+        assert get_results(survey_id)['1'] == {'Oui': len(user_ids)}
+        db.engine.dispose()
+
+
+def test_bulk_statuses(app):
+    author = create_user('author')
+    alice, bob, carol = create_user('alice'), create_user('bob'), create_user('carol')
+    survey = create_survey(author)
+    save_response(survey.id, carol.id, answers())
+    definition = get_definition(survey.id)
+
+    statuses = bulk_save_responses(definition, [
+        {'user_id': alice.id, 'answers': answers()},
+        {'user_id': alice.id, 'answers': answers(choice='Non')},
+        {'user_id': bob.id, 'answers': answers(choice='Peut-être')},
+        {'user_id': carol.id, 'answers': answers()},
+        {'user_id': 9999, 'answers': answers()},
+        'pas un objet',
+    ])
+
+    assert [status['status'] for status in statuses] == [
+        CREATED, DUPLICATE, INVALID, DUPLICATE, INVALID, INVALID]
+    assert Response.query.filter_by(survey_id=survey.id).count() == 2
+    assert get_results(survey.id)['1'] == {'Oui': 2}
+
+
+def test_bulk_rejects_accounts_the_caller_cannot_act_for(app):
+    author, alice = create_user('author'), create_user('alice')
+    survey = create_survey(author)
+
+    statuses = bulk_save_responses(get_definition(survey.id), [
+        {'user_id': author.id, 'answers': answers()},
+        {'user_id': alice.id, 'answers': answers()},
+    ], allowed_user_ids={author.id})
+
+    assert [status['status'] for status in statuses] == [CREATED, INVALID]
+    assert Response.query.filter_by(survey_id=survey.id, user_id=alice.id).count() == 0
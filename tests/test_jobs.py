@@ -0,0 +1,116 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import QUESTIONS, answers, create_survey, create_user
+from ingest import save_response
+from jobs import (DONE, FAILED, PENDING, RUNNING, Job, _run_job, find_active_job, submit_job)
+from models import db, Survey, Response
+from tallies import get_results
+
+
+def wait_for(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        job = db.session.get(Job, job_id)
+        if job.status in (DONE, FAILED):
+            return job
+        time.sleep(0.02)
+    pytest.fail(f'tâche {job_id} non terminée')
+
+
+def add_job(kind, survey_id, status=PENDING, heartbeat_at=None, **params):
+    job = Job(id=os.urandom(16).hex(), kind=kind, survey_id=survey_id, status=status,
+              params=json.dumps(params, sort_keys=True), heartbeat_at=heartbeat_at or datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def survey_with_responses(count=3):
+    survey = create_survey(create_user('author'))
+    for i in range(count):
+        save_response(survey.id, create_user(f'user{i}').id, answers())
+    return survey
+
+
+def test_delete_job_purges_survey_in_chunks(app, monkeypatch):
+    monkeypatch.setattr('jobs.DELETE_CHUNK', 2)
+    survey = survey_with_responses(5)
+    survey_id = survey.id
+
+    job = wait_for(submit_job('delete_survey', survey_id=survey_id).id)
+
+    assert (job.status, job.progress) == (DONE, 1.0)
+    assert db.session.get(Survey, survey_id) is None
+    assert Response.query.filter_by(survey_id=survey_id).count() == 0
+    assert get_results(survey_id) == {}
+
+
+def test_export_job_writes_its_file(app):
+    survey = survey_with_responses(2)
+
+    job = wait_for(submit_job('export', survey_id=survey.id, fmt='ndjson', gzip=False).id)
+
+    assert job.status == DONE
+    with open(job.result_path) as f:
+        assert len(f.read().splitlines()) == 2
+
+
+def test_active_job_is_reused_only_with_the_same_parameters(app):
+    survey = create_survey(create_user('author'))
+    job = add_job('export', survey.id, fmt='csv', gzip=True)
+
+    assert find_active_job('export', survey.id, fmt='csv', gzip=True).id == job.id
+    assert find_active_job('export', survey.id, fmt='csv', gzip=False) is None
+    assert find_active_job('export', survey.id).id == job.id
+
+
+def test_stale_job_is_requeued_and_runs_once(app):
+    survey = survey_with_responses(2)
+    stale = datetime.utcnow() - timedelta(hours=1)
+    job = add_job('rebuild_results', survey.id, status=RUNNING, heartbeat_at=stale)
+
+    found = find_active_job('rebuild_results', survey.id)
+
+    assert found.id == job.id
+    assert wait_for(job.id).status == DONE
+    # Une seconde exécution du même identifiant ne fait rien
+    finished_at = db.session.get(Job, job.id).finished_at
+    _run_job(app, job.id)
+    db.session.expire_all()
+    assert db.session.get(Job, job.id).finished_at == finished_at
+
+
+def test_live_job_is_not_requeued(app):
+    survey = create_survey(create_user('author'))
+    job = add_job('rebuild_results', survey.id, status=RUNNING)
+
+    assert find_active_job('rebuild_results', survey.id).status == RUNNING
+    assert db.session.get(Job, job.id).status == RUNNING
+
+
+def test_rebuild_job_recounts_after_questions_change(app):
+    survey = survey_with_responses(2)
+    # La question libre devient une question à choix : ses réponses sont désormais comptées
+    survey.questions = json.dumps([dict(q, type='choice', choices=[answers()['3']]) if q['id'] == '3' else q
+                                   for q in QUESTIONS])
+    db.session.commit()
+    assert '3' not in get_results(survey.id)
+
+    job = wait_for(submit_job('rebuild_results', survey_id=survey.id).id)
+
+    assert job.status == DONE
+    assert get_results(survey.id)['3'] == {answers()['3']: 2}
+    assert get_results(survey.id)['1'] == {'Oui': 2}
+
+
+def test_failing_job_records_its_error(app):
+    job = wait_for(submit_job('export', survey_id=12345).id)
+
+    assert job.status == FAILED
+    assert job.error
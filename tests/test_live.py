@@ -0,0 +1,71 @@
+import json
+
+from conftest import answers, create_survey, create_user
+from ingest import save_response
+from live import Broker, Subscriber, broker, merge_counts, stream_results
+from tallies import get_results
+
+
+def parse(event):
+    name, data = event.strip().split('\n')
+    return name[len('event: '):], json.loads(data[len('data: '):])
+
+
+def test_broker_fans_out_to_every_subscriber():
+    local = Broker()
+    first, second = local.subscribe(1), local.subscribe(1)
+    other = local.subscribe(2)
+
+    local.publish(1, {'q': {'a': 1}})
+
+    assert first.queue.get_nowait() == second.queue.get_nowait() == {'q': {'a': 1}}
+    assert other.queue.empty()
+    local.unsubscribe(1, first)
+    local.unsubscribe(1, second)
+    assert local.subscriber_count() == 1
+
+
+def test_full_queue_marks_the_subscriber_overflowed():
+    local = Broker()
+    subscriber = local.subscribers.setdefault(1, set())
+    slow = Subscriber(max_pending=1)
+    subscriber.add(slow)
+
+    local.publish(1, {'q': {'a': 1}})
+    local.publish(1, {'q': {'a': 1}})
+
+    assert slow.overflowed
+
+
+def test_merge_counts():
+    assert merge_counts({'q': {'a': 1}}, {'q': {'a': 2, 'b': 1}, 'r': {'x': 1}}) == {
+        'q': {'a': 3, 'b': 1}, 'r': {'x': 1}}
+
+
+def test_stream_sends_snapshot_then_deltas_from_submissions(app):
+    survey = create_survey(create_user('author'))
+    subscriber = broker.subscribe(survey.id)
+    stream = stream_results(survey.id, get_results(survey.id), subscriber,
+                            lambda: get_results(survey.id), heartbeat=5)
+
+    assert parse(next(stream)) == ('snapshot', {})
+    save_response(survey.id, create_user('alice').id, answers(choice='Non', rating=2))
+    assert parse(next(stream)) == ('delta', {'1': {'Non': 1}, '2': {'2': 1}})
+
+    stream.close()
+    assert broker.subscriber_count(survey.id) == 0
+
+
+def test_stream_resyncs_with_submissions_from_other_workers():
+    local = {'q': {'a': 1}}
+    subscriber = Subscriber()
+    stream = stream_results(1, {'q': {'a': 1}}, subscriber,
+                            lambda: {q: dict(o) for q, o in local.items()}, heartbeat=0.05)
+
+    assert parse(next(stream)) == ('snapshot', {'q': {'a': 1}})
+    # Rien de nouveau : simple commentaire pour garder la connexion
+    assert next(stream) == ': keep-alive\n\n'
+    # Réponse validée par un autre processus : aucun incrément ne parvient ici
+    local['q']['a'] = 2
+    assert parse(next(stream)) == ('snapshot', {'q': {'a': 2}})
+    stream.close()
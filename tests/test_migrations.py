@@ -0,0 +1,65 @@
+import json
+
+import sqlalchemy as sa
+from flask_migrate import upgrade
+
+from conftest import create_survey, create_user, make_app
+from models import db, Survey, Response
+from search import search
+from tallies import get_results, rebuild_results
+from textstats import text_summaries
+
+BASELINE_TABLES = ('user', 'survey', 'response')
+NEW_TABLES = ('response_answer', 'survey_tally', 'job', 'archived_survey', 'text_stat')
+
+
+def create_baseline():
+    """Schéma d'origine, sans les tables ajoutées par la série de migrations."""
+    db.metadata.create_all(db.engine, tables=[db.metadata.tables[name] for name in BASELINE_TABLES])
+    survey = create_survey(create_user('author'))
+    return survey, [create_user('alice').id, create_user('bob').id]
+
+
+def test_upgrade_from_baseline_then_rebuild(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        survey, (alice, bob) = create_baseline()
+        # Réponses insérées directement : les tables de compteurs n'existent pas encore
+        db.session.execute(Response.__table__.insert(), [
+            {'survey_id': survey.id, 'user_id': alice,
+             'answers': json.dumps({'1': 'Oui', '2': 4, '3': 'Accueil agréable'})},
+            {'survey_id': survey.id, 'user_id': bob,
+             'answers': json.dumps({'1': 'Non', '2': 2, '3': 'Attente trop longue'})},
+        ])
+        db.session.commit()
+
+        upgrade()
+
+        tables = set(sa.inspect(db.engine).get_table_names())
+        assert set(NEW_TABLES) <= tables
+        rebuild_results(db.session.get(Survey, survey.id))
+        db.session.commit()
+        assert get_results(survey.id)['1'] == {'Oui': 1, 'Non': 1}
+        assert text_summaries(survey.id)['3']['answers'] == 2
+        # Index plein texte rempli à partir des sondages existants
+        assert [s.id for s in search('satisfaction')[0]] == [survey.id]
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_upgrade_after_create_all(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        # Base créée par `db.create_all()` (lancement de l'application) avant la migration
+        db.create_all()
+        author = create_user('author')
+        create_survey(author)
+
+        upgrade()
+
+        inspector = sa.inspect(db.engine)
+        assert 'uq_response_survey_user' in {index['name'] for index in inspector.get_indexes('response')}
+        assert 'heartbeat_at' in {column['name'] for column in inspector.get_columns('job')}
+        assert 'archive_id' in {column['name'] for column in inspector.get_columns('archived_survey')}
+        db.session.remove()
+        db.engine.dispose()
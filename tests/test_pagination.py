@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from conftest import create_survey, create_user
+from models import Survey
+from pagination import MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE, keyset_page, page_size
+
+
+def all_pages(query, limit):
+    ids, cursor = [], None
+    while True:
+        page = keyset_page(query, Survey.id, cursor, limit, created_column=Survey.created_at)
+        ids.append([survey.id for survey in page.items])
+        cursor = page.next_cursor
+        if cursor is None:
+            return ids
+
+
+def test_keyset_pages_cover_every_row_once_newest_first(app):
+    author = create_user('author')
+    now = datetime.utcnow()
+    # Deux sondages partagent la même date : l'identifiant départage
+    dates = [now - timedelta(days=3), now - timedelta(days=1), now - timedelta(days=1), now]
+    surveys = [create_survey(author, title=f'Sondage {i}', created_at=date) for i, date in enumerate(dates)]
+
+    pages = all_pages(Survey.query, 3)
+
+    expected = [s.id for s in sorted(surveys, key=lambda s: (s.created_at, s.id), reverse=True)]
+    assert pages == [expected[:3], expected[3:]]
+
+
+def test_last_full_page_has_no_next_cursor(app):
+    author = create_user('author')
+    for i in range(4):
+        create_survey(author, title=f'Sondage {i}')
+
+    assert [len(ids) for ids in all_pages(Survey.query, 2)] == [2, 2]
+
+
+def test_invalid_cursor_starts_from_the_first_page(app):
+    author = create_user('author')
+    create_survey(author)
+
+    page = keyset_page(Survey.query, Survey.id, 'pas-un-curseur', 10, created_column=Survey.created_at)
+    assert len(page.items) == 1
+
+
+def test_page_size_is_bounded():
+    assert page_size(None) == DEFAULT_PAGE_SIZE
+    assert page_size(0) == DEFAULT_PAGE_SIZE
+    assert page_size(10) == 10
+    assert page_size(10_000) == MAX_PAGE_SIZE
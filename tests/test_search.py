@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from conftest import create_survey, create_user
+from models import db
+from search import index_survey, match_expression, rebuild_index, remove_survey, search
+
+
+def indexed_survey(author, title, description='Description', **kwargs):
+    survey = create_survey(author, title=title, **kwargs)
+    survey.description = description
+    index_survey(survey)
+    db.session.commit()
+    return survey
+
+
+def titles(keyword, **filters):
+    return [survey.title for survey in search(keyword, **filters)[0]]
+
+
+def test_title_matches_rank_before_description_matches(app):
+    author = create_user('author')
+    indexed_survey(author, 'Enquête transport', description='Votre avis sur la cantine')
+    indexed_survey(author, 'Qualité de la cantine')
+
+    assert titles('cantine') == ['Qualité de la cantine', 'Enquête transport']
+
+
+def test_search_ignores_accents_and_matches_prefixes(app):
+    author = create_user('author')
+    indexed_survey(author, 'Sécurité au travail')
+
+    assert titles('securite') == ['Sécurité au travail']
+    assert titles('sécu') == ['Sécurité au travail']
+    # Les questions sont indexées aussi
+    assert titles('commentaire') == ['Sécurité au travail']
+
+
+def test_search_applies_filters_in_the_same_query(app):
+    author, other = create_user('author'), create_user('other')
+    indexed_survey(author, 'Avis clients actif')
+    indexed_survey(author, 'Avis clients clos', end_date=datetime.utcnow() - timedelta(days=1))
+    indexed_survey(other, 'Avis clients autre auteur')
+
+    assert titles('avis', status='active', author='author') == ['Avis clients actif']
+    assert titles('avis', status='expired') == ['Avis clients clos']
+
+
+def test_removed_and_rebuilt_index(app):
+    author = create_user('author')
+    survey = indexed_survey(author, 'Restauration scolaire')
+    remove_survey(survey.id)
+    db.session.commit()
+    assert titles('restauration') == []
+
+    rebuild_index()
+    db.session.commit()
+    assert titles('restauration') == ['Restauration scolaire']
+
+
+def test_match_expression_neutralises_fts_syntax():
+    assert match_expression('prix" OR title:*') == '"prix"* "OR"* "title"*'
+    assert match_expression('') == ''
@@ -0,0 +1,48 @@
+from conftest import create_survey, create_user
+from models import db, Survey
+from survey_cache import SurveyCache
+
+
+def test_definition_is_cached_until_its_version_is_bumped(app):
+    cache = SurveyCache()
+    survey = create_survey(create_user('author'), title='Avant')
+
+    assert cache.get(survey.id).title == 'Avant'
+    assert cache.get(survey.id).questions[0]['id'] == '1'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    survey.title = 'Après'
+    db.session.commit()
+    assert cache.get(survey.id).title == 'Avant'
+    cache.bump_version(survey.id)
+    assert cache.get(survey.id).title == 'Après'
+
+
+def test_cache_is_bounded(app):
+    cache = SurveyCache(max_size=2)
+    author = create_user('author')
+    surveys = [create_survey(author, title=f'Sondage {i}') for i in range(3)]
+
+    for survey in surveys:
+        cache.get(survey.id)
+    for survey in surveys:
+        cache.bump_version(survey.id)
+
+    assert cache.stats()['size'] == 0
+    assert cache.evictions == 1
+    assert cache.get(9999) is None
+
+
+def test_load_started_before_an_invalidation_is_not_stored(app, monkeypatch):
+    cache = SurveyCache()
+    survey = create_survey(create_user('author'))
+    get_questions = Survey.get_questions
+
+    def edited_during_load(self):
+        # Le sondage est modifié pendant que la définition est lue
+        cache.bump_version(self.id)
+        return get_questions(self)
+
+    monkeypatch.setattr(Survey, 'get_questions', edited_during_load)
+    assert cache.get(survey.id) is not None
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,60 @@
+from conftest import answers, create_survey, create_user
+from ingest import bulk_save_responses, save_response
+from models import db
+from survey_cache import get_definition
+from tallies import get_results, rebuild_results
+from textstats import text_summaries
+
+COMMENTS = [
+    "L'accueil était agréable et le service rapide",
+    'Service lent, personnel agréable',
+    'Qualité du produit excellente, qualite constante',
+    'Livraison rapide',
+]
+
+
+def submit_all(survey, users):
+    for i, user in enumerate(users[:2]):
+        save_response(survey.id, user.id, answers(choice='Oui', rating=i + 3, comment=COMMENTS[i]))
+    # Le chemin groupé doit produire les mêmes compteurs que le chemin unitaire
+    bulk_save_responses(get_definition(survey.id), [
+        {'user_id': user.id, 'answers': answers(choice='Non', rating=5, comment=COMMENTS[i + 2])}
+        for i, user in enumerate(users[2:])])
+
+
+def test_incremental_tallies_match_rebuild(app):
+    author = create_user('author')
+    users = [create_user(f'user{i}') for i in range(4)]
+    survey = create_survey(author)
+    submit_all(survey, users)
+
+    incremental = get_results(survey.id)
+    assert incremental['1'] == {'Oui': 2, 'Non': 2}
+    # Les questions libres ne sont pas comptées par option
+    assert '3' not in incremental
+
+    rebuild_results(survey)
+    db.session.commit()
+    assert get_results(survey.id) == incremental
+
+
+def test_incremental_text_stats_match_rebuild(app):
+    author = create_user('author')
+    users = [create_user(f'user{i}') for i in range(4)]
+    survey = create_survey(author)
+    submit_all(survey, users)
+
+    incremental = text_summaries(survey.id)['3']
+    assert incremental['answers'] == 4
+    terms = dict(incremental['top_terms'])
+    # Accents et élisions ignorés, mots vides retirés
+    assert terms['qualité'] == 2
+    assert 'accueil' in terms and 'le' not in terms
+
+    rebuild_results(survey)
+    db.session.commit()
+    rebuilt = text_summaries(survey.id)['3']
+    assert rebuilt['answers'] == incremental['answers']
+    assert rebuilt['mean_length'] == incremental['mean_length']
+    assert rebuilt['length_histogram'] == incremental['length_histogram']
+    assert dict(rebuilt['top_terms']) == terms
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+from answers import ResponseAnswer
+from models import db
+
+# Count-min sketch : DEPTH x WIDTH compteurs par question (32 Ko)
+DEPTH = 4
+WIDTH = 2048
+TOP_K = 50
+# Bornes (en caractères) de l'histogramme des longueurs de réponse
+LENGTH_EDGES = (10, 25, 50, 100, 250, 500, 1000)
+
+_ELISION = re.compile(r"\b(?:[cdjlmnst]|qu|jusqu|lorsqu|puisqu)['’]", re.IGNORECASE)
+_WORD = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+STOPWORDS = frozenset('''
+a ai aie aient aies ait alors as au aucun aussi autre aux avait avant avec avoir bon
+c ca car ce cela ces cet cette ceci ceux chaque ci comme comment d dans de des du donc dont
+elle elles en encore est et etaient etait ete etre eu eux fait faire fois font il ils
+j je jusqu l la le les leur leurs lui m ma mais me meme mes moi mon n ne ni nos notre nous
+on ont ou par parce pas peu peut plus pour pourquoi qu quand que quel quelle quelles quels
+qui s sa sans se ses si sien son sont sous suis sur t ta te tes toi ton tous tout toute
+toutes tres tu un une vos votre vous y
+'''.split())
+
+
+def fold(word):
+    """Supprime les accents : « qualité » et « qualite » comptent comme un seul terme."""
+    decomposed = unicodedata.normalize('NFKD', word)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Découpe un texte français en termes (forme sans accents, forme d'origine).
+
+    Les élisions (l', qu'...) et les mots vides sont retirés.
+    """
+    text = _ELISION.sub(' ', text.lower())
+    for word in _WORD.findall(text):
+        key = fold(word)
+        if len(key) < 2 or key in STOPWORDS:
+            continue
+        yield key, word
+
+
+class TextStat(db.Model):
+    """Statistiques incrémentales des réponses libres d'une question."""
+    __tablename__ = 'text_stat'
+    __table_args__ = (
+        db.UniqueConstraint('survey_id', 'question_id', name='uq_text_stat'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    survey_id = db.Column(db.Integer, db.ForeignKey('survey.id'), nullable=False)
+    question_id = db.Column(db.String(64), nullable=False)
+    answer_count = db.Column(db.Integer, nullable=False, default=0)
+    total_length = db.Column(db.Integer, nullable=False, default=0)
+    length_histogram = db.Column(db.Text, nullable=False, default='[]')
+    sketch = db.Column(db.LargeBinary)
+    top_terms = db.Column(db.Text, nullable=False, default='{}')
+
+    def load_sketch(self):
+        if not self.sketch:
+            return np.zeros((DEPTH, WIDTH), dtype=np.int32)
+        return np.frombuffer(self.sketch, dtype=np.int32).reshape(DEPTH, WIDTH).copy()
+
+    def summary(self, limit=20):
+        top = sorted(json.loads(self.top_terms).values(), key=lambda t: -t[0])[:limit]
+        labels = [f'< {LENGTH_EDGES[0]}'] + [
+            f'{low}-{high}' for low, high in zip(LENGTH_EDGES, LENGTH_EDGES[1:])] + [f'>= {LENGTH_EDGES[-1]}']
+        return {
+            'answers': self.answer_count,
+            'mean_length': self.total_length / self.answer_count if self.answer_count else 0.0,
+            'length_histogram': list(zip(labels, json.loads(self.length_histogram) or [0] * len(labels))),
+            'top_terms': [(display, count) for count, display in top],
+        }
+
+
+def _positions(terms):
+    """Colonnes du sketch pour chaque terme : matrice len(terms) x DEPTH."""
+    hashes = np.array([np.frombuffer(hashlib.blake2b(t.encode('utf-8'), digest_size=8).digest(),
+                                     dtype=np.uint32) for t in terms], dtype=np.uint64)
+    h1, h2 = hashes[:, 0:1], hashes[:, 1:2] | 1
+    return ((h1 + np.arange(DEPTH, dtype=np.uint64) * h2) % WIDTH).astype(np.intp)
+
+
+def _update(stat, values):
+    counts, display = Counter(), {}
+    for value in values:
+        for key, word in tokenize(value):
+            counts[key] += 1
+            display.setdefault(key, word)
+
+    lengths = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+    histogram = np.array(json.loads(stat.length_histogram) or [0] * (len(LENGTH_EDGES) + 1))
+    histogram += np.bincount(np.searchsorted(LENGTH_EDGES, lengths, side='right'),
+                             minlength=len(LENGTH_EDGES) + 1)
+    stat.length_histogram = json.dumps(histogram.tolist())
+
+    if not counts:
+        return
+    terms = list(counts)
+    sketch = stat.load_sketch()
+    rows = np.arange(DEPTH)
+    positions = _positions(terms)
+    np.add.at(sketch, (rows, positions), np.array([counts[t] for t in terms], dtype=np.int32)[:, None])
+    estimates = sketch[rows, positions].min(axis=1)
+    stat.sketch = sketch.tobytes()
+
+    # Top-k : on garde les TOP_K termes dont l'estimation est la plus haute
+    top = json.loads(stat.top_terms)
+    for term, estimate in zip(terms, estimates.tolist()):
+        if term in top:
+            top[term][0] = estimate
+        elif len(top) < TOP_K:
+            top[term] = [estimate, display[term]]
+        else:
+            weakest = min(top, key=lambda t: top[t][0])
+            if estimate > top[weakest][0]:
+                del top[weakest]
+                top[term] = [estimate, display[term]]
+    stat.top_terms = json.dumps(top, ensure_ascii=False)
+
+
+def update_text_stats(survey_id, texts):
+    """Ajoute des réponses libres {question: [textes]} aux statistiques (sans commit)."""
+    table = TextStat.__table__
+    for question_id, values in texts.items():
+        if not values:
+            continue
+        # L'UPDATE prend le verrou d'écriture avant la lecture du sketch
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.survey_id == survey_id, table.c.question_id == question_id)
+            .values(answer_count=table.c.answer_count + len(values),
+                    total_length=table.c.total_length + sum(len(v) for v in values))
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(
+                survey_id=survey_id, question_id=question_id, answer_count=len(values),
+                total_length=sum(len(v) for v in values)))
+        stat = (db.session.query(TextStat).populate_existing()
+                .filter_by(survey_id=survey_id, question_id=question_id).one())
+        _update(stat, values)
+
+
+def clear_text_stats(survey_id):
+    TextStat.query.filter_by(survey_id=survey_id).delete(synchronize_session=False)
+
+
+def rebuild_text_stats(survey_id, question_ids, batch_size=5000):
+    """Recalcule les statistiques des questions libres à partir des réponses stockées."""
+    clear_text_stats(survey_id)
+    batch = {}
+    rows = (db.session.query(ResponseAnswer.question_id, ResponseAnswer.choice)
+            .filter(ResponseAnswer.survey_id == survey_id,
+                    ResponseAnswer.question_id.in_(list(question_ids)),
+                    ResponseAnswer.choice.isnot(None))
+            .yield_per(batch_size))
+    pending = 0
+    for question_id, text in rows:
+        batch.setdefault(question_id, []).append(text)
+        pending += 1
+        if pending == batch_size:
+            update_text_stats(survey_id, batch)
+            batch, pending = {}, 0
+    update_text_stats(survey_id, batch)
+
+
+def text_summaries(survey_id):
+    return {stat.question_id: stat.summary() for stat in TextStat.query.filter_by(survey_id=survey_id)}
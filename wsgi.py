@@ -0,0 +1,5 @@
+"""Point d'entrée de production : gunicorn -c gunicorn.conf.py wsgi:app"""
+from app import app  # noqa: F401 - objet WSGI chargé par gunicorn
+
+# Pas de `db.create_all()` ici : la base se prépare avec `flask init-db` ou
+# `flask db upgrade` (voir le README).